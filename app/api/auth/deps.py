@@ -1,30 +1,86 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+import functools
+import time
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from decouple import config
 from typing import Annotated, Union
+from uuid import UUID
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import LRUCache
+from app.db.models import User
+from app.deps.rate_limit import RateLimit, client_ip
 from app.enums import Role
 
 JWT_SECRET = config("JWT_SECRET")
 JWT_ALG = config("JWT_ALG")
+TOKEN_CACHE_SIZE = config("TOKEN_CACHE_SIZE", default=4096, cast=int)
+# attempts allowed per RATE_LIMIT_WINDOW seconds
+RATE_LIMIT_WINDOW = config("RATE_LIMIT_WINDOW", default=60, cast=float)
+LOGIN_IP_ATTEMPTS = config("LOGIN_IP_ATTEMPTS", default=20, cast=int)
+LOGIN_USERNAME_ATTEMPTS = config("LOGIN_USERNAME_ATTEMPTS", default=10, cast=int)
+REGISTER_IP_ATTEMPTS = config("REGISTER_IP_ATTEMPTS", default=5, cast=int)
+
+# verified token -> claims, so a client's repeated requests skip the signature
+# check; each entry expires together with its token
+token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+login_ip_limit = RateLimit("login_ip", LOGIN_IP_ATTEMPTS, RATE_LIMIT_WINDOW)
+login_username_limit = RateLimit("login_username", LOGIN_USERNAME_ATTEMPTS, RATE_LIMIT_WINDOW)
+register_ip_limit = RateLimit("register_ip", REGISTER_IP_ATTEMPTS, RATE_LIMIT_WINDOW)
+
+async def limit_login_attempts(request: Request, data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+    # runs before the user lookup and the Argon2 verify; the form is the same
+    # instance the login route receives
+    await login_ip_limit.check(client_ip(request))
+    await login_username_limit.check(data.username.lower())
+
 def get_current_user(token: Annotated[Union[str,None], Depends(oauth2_scheme)]):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials"
     )
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+        except JWTError:
+            raise credentials_exception
         user_id = payload.get("sub")
         role = payload.get("role")
-        if user_id is None or role is None:
+        # refresh tokens only work on /auth/refresh; tokens without a type predate them
+        if user_id is None or role is None or payload.get("type", "access") != "access":
             raise credentials_exception
-        return {"user_id": user_id, "role": role}
-    except JWTError:
-        raise credentials_exception
+        claims = {"user_id": user_id, "role": role}
+        expires_at = payload.get("exp")
+        token_cache.set(token, claims, ttl=expires_at - time.time() if expires_at is not None else None)
+    return dict(claims)
+
+class Principal:
+    # The authenticated caller of one request. The User row is only loaded when
+    # something asks for it, and then shared by everything else in the request.
+    def __init__(self, user_id: UUID, role: Role):
+        self.user_id = user_id
+        self.role = role
+        self._user: User | None = None
+        self._loaded = False
+
+    async def get_user(self, session: AsyncSession) -> User | None:
+        if not self._loaded:
+            self._user = await session.get(User, self.user_id)
+            self._loaded = True
+        return self._user
+
+def get_principal(current_user=Depends(get_current_user)) -> Principal:
+    # cached per request by FastAPI like any other dependency
+    return Principal(UUID(current_user["user_id"]), Role(current_user["role"]))
 
+# one dependency callable per role, so FastAPI runs it once per request even
+# when a route declares it both in `dependencies` and as a parameter
+@functools.lru_cache
 def require_role(required_role: Role):
     def role_dependency(current_user=Depends(get_current_user)):
         if Role(current_user["role"]) != required_role:
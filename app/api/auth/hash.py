@@ -1,8 +1,29 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
+from decouple import config
+
+# argon2-cffi releases the GIL while hashing, so a thread pool is enough to
+# keep the event loop free and still use several cores
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=min(4, os.cpu_count() or 1), cast=int)
 
 ph = PasswordHasher()
 
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="argon2")
+_stats_lock = threading.Lock()
+_stats = {
+    "queued": 0,
+    "running": 0,
+    "completed": 0,
+    "queue_wait_seconds_total": 0.0,
+    "queue_wait_seconds_max": 0.0,
+}
+
 def hash_password(password: str):
     return ph.hash(password=password)
 
@@ -12,4 +33,35 @@ def verify_hash(hashed_password: str, password: str):
     except VerifyMismatchError:
         return False
 def check_needs_rehash(hashed_password: str):
-    return ph.check_needs_rehash(hash=hashed_password)
\ No newline at end of file
+    return ph.check_needs_rehash(hash=hashed_password)
+
+async def _run_in_pool(fn, *args):
+    submitted_at = time.perf_counter()
+    with _stats_lock:
+        _stats["queued"] += 1
+
+    def job():
+        waited = time.perf_counter() - submitted_at
+        with _stats_lock:
+            _stats["queued"] -= 1
+            _stats["running"] += 1
+            _stats["queue_wait_seconds_total"] += waited
+            _stats["queue_wait_seconds_max"] = max(_stats["queue_wait_seconds_max"], waited)
+        try:
+            return fn(*args)
+        finally:
+            with _stats_lock:
+                _stats["running"] -= 1
+                _stats["completed"] += 1
+
+    return await asyncio.get_running_loop().run_in_executor(_executor, job)
+
+async def hash_password_async(password: str):
+    return await _run_in_pool(hash_password, password)
+
+async def verify_hash_async(hashed_password: str, password: str):
+    return await _run_in_pool(verify_hash, hashed_password, password)
+
+def password_hash_stats() -> dict:
+    with _stats_lock:
+        return {"workers": PASSWORD_HASH_WORKERS, **_stats}
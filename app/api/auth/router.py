@@ -1,51 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Annotated
+from uuid import UUID
 
 from app.db.db import db_session
 from app.db.models import User
-from app.api.users.service import update_password
+from app.api.users.service import rehash_password
 
-from .hash import verify_hash,check_needs_rehash
+from .deps import limit_login_attempts
+from .hash import verify_hash_async,check_needs_rehash
+from .service import is_token_family_revoked, revoke_token, revoke_token_family
 from .token import create_access_token, create_refresh_token, decode_token
-from .schemas import Token
+from .schemas import RefreshRequest, Token
 
 from app.api.response_code import common_responses
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-@router.post("/login", response_model=Token, responses={ 401: {**common_responses[401], "content": {
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_login_attempts)], responses={ 401: {**common_responses[401], "content": {
     "application/json": {
         "example": {
             "detail": "Incorrect credentials"
         }
     }
-    }},500: {**common_responses[500]}})
+    }}, 429: {"description": "Too Many Requests"}, 500: {**common_responses[500]}})
 async def login(data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(db_session)) -> Token:
-    result = await session.exec(select(User).where(User.username == data.username))
+    # only the columns login needs; the hash is verified in the worker pool
+    result = await session.exec(
+        select(User.id, User.role, User.password_hash).where(User.username == data.username)
+    )
     user = result.one_or_none()
-    if not user or not verify_hash(user.password_hash, data.password):
+    # release the connection before the slow part
+    await session.close()
+    if not user or not await verify_hash_async(user.password_hash, data.password):
         raise HTTPException(status_code=401, detail="Incorrect credentials",headers={"WWW-Authenticate": "Bearer"},)
 
-    #token_data = {"sub": user.id, "role": user.role}
     if check_needs_rehash(user.password_hash):
-        user = await update_password(user.id, data.password)
+        # after the response, so stronger hash parameters don't slow down login
+        background_tasks.add_task(rehash_password, user.id, user.password_hash, data.password)
     
     return Token(
-        access_token=create_access_token(user.id, user.role)
+        access_token=create_access_token(user.id, user.role),
+        refresh_token=create_refresh_token(user.id, user.role),
     )
 
-@router.post("/refresh", response_model=Token)
-def refresh_token(refresh_token: str):
-    payload = decode_token(refresh_token)
-    if not payload or payload.get("type") != "refresh":
-        raise HTTPException(status_code=401, detail="Invalid refresh token")
-    
-    token_data = {"sub": payload["sub"], "role": payload["role"]}
-    return {
-        "access_token": create_access_token(token_data),
-        "refresh_token": create_refresh_token(token_data)
+@router.post("/refresh", response_model=Token, responses={ 401: {**common_responses[401], "content": {
+    "application/json": {
+        "example": {
+            "detail": "Invalid refresh token"
+        }
     }
+    }}, 500: {**common_responses[500]}})
+async def refresh_token(data: RefreshRequest, session: AsyncSession = Depends(db_session)) -> Token:
+    # a signature check, two primary key lookups and one insert; no password hash involved
+    payload = decode_token(data.refresh_token)
+    if not payload or payload.get("type") != "refresh" or not payload.get("jti"):
+        raise HTTPException(status_code=401, detail="Invalid refresh token", headers={"WWW-Authenticate": "Bearer"})
+
+    # the role is re-read so a deleted or demoted user can't keep renewing the old one
+    try:
+        user_id = UUID(payload["sub"])
+    except (KeyError, ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=401, detail="Invalid refresh token", headers={"WWW-Authenticate": "Bearer"})
+    result = await session.exec(select(User.id, User.role).where(User.id == user_id))
+    user = result.one_or_none()
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid refresh token", headers={"WWW-Authenticate": "Bearer"})
+
+    # rotation: each refresh token works once. A replayed one means it was
+    # copied, so its whole family is revoked: whichever of the two holders
+    # refreshes next is logged out. Access tokens already issued stay valid
+    # until they expire. Tokens issued before families existed are their own.
+    family = payload.get("fam") or payload["jti"]
+    if await is_token_family_revoked(family, session):
+        raise HTTPException(status_code=401, detail="Invalid refresh token", headers={"WWW-Authenticate": "Bearer"})
+    if not await revoke_token(payload["jti"], payload["exp"], session):
+        await revoke_token_family(family, session)
+        raise HTTPException(status_code=401, detail="Invalid refresh token", headers={"WWW-Authenticate": "Bearer"})
+
+    return Token(
+        access_token=create_access_token(user.id, user.role),
+        refresh_token=create_refresh_token(user.id, user.role, family),
+    )
@@ -4,9 +4,12 @@ from uuid import UUID
 
 class Token(BaseModel):
     access_token: str
-    #refresh_token: str
+    refresh_token: str
     token_type: str = "bearer"
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class TokenData(BaseModel):
     user_id: UUID
     role: str
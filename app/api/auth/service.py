@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import RevokedToken, RevokedTokenFamily
+from .token import JWT_REFRESH_TOKEN_EXP
+
+def _utc_now() -> datetime:
+    # the column is a naive timestamp holding UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+async def revoke_token(jti: str, expires_at: int, session: AsyncSession) -> bool:
+    # True when this call revoked it, False when it was already revoked; one
+    # statement, so two concurrent refreshes with the same token can't both win
+    statement = (
+        insert(RevokedToken)
+        .values(jti=jti, expires_at=datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None))
+        .on_conflict_do_nothing(index_elements=["jti"])
+        .returning(RevokedToken.jti)
+    )
+    result = await session.exec(statement)
+    revoked = result.scalar() is not None
+    await session.commit()
+    return revoked
+
+async def is_token_family_revoked(family: str, session: AsyncSession) -> bool:
+    return await session.get(RevokedTokenFamily, family) is not None
+
+async def revoke_token_family(family: str, session: AsyncSession):
+    # every token of the family was issued by now, so none outlives this
+    expires_at = _utc_now() + timedelta(days=JWT_REFRESH_TOKEN_EXP)
+    await session.exec(
+        insert(RevokedTokenFamily)
+        .values(family=family, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=["family"])
+    )
+    await session.commit()
+
+async def purge_revoked_tokens(session: AsyncSession) -> int:
+    # an expired token fails signature validation anyway, its row isn't needed
+    now = _utc_now()
+    result = await session.exec(delete(RevokedToken).where(RevokedToken.expires_at < now))
+    families = await session.exec(delete(RevokedTokenFamily).where(RevokedTokenFamily.expires_at < now))
+    await session.commit()
+    return result.rowcount + families.rowcount
@@ -1,6 +1,6 @@
-from uuid import UUID
+from uuid import UUID, uuid4
 from jose import jwt, JWTError
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from decouple import config
 
 JWT_SECRET = config("JWT_SECRET")
@@ -8,20 +8,26 @@ JWT_ALG= config("JWT_ALG")
 JWT_ACCESS_TOKEN_EXP = config("JWT_ACCESS_TOKEN_EXP", cast=int)
 JWT_REFRESH_TOKEN_EXP = config("JWT_REFRESH_TOKEN_EXP", cast=int)
 
-def create_token(user_id: UUID, role: str, expires_delta: timedelta, token_type: str = "access"):
+def create_token(user_id: UUID, role: str, expires_delta: timedelta, token_type: str = "access", family: str | None = None):
+    # jti identifies a single refresh token so it can be revoked once used; fam
+    # is shared by every refresh token rotated from the same login
     payload = {
         "sub": str(user_id),
         "role": role,
+        "type": token_type,
+        "jti": uuid4().hex,
     }
-    expire = datetime.now() + expires_delta
+    if token_type == "refresh":
+        payload["fam"] = family or payload["jti"]
+    expire = datetime.now(timezone.utc) + expires_delta
     payload.update({"exp": expire})
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
 def create_access_token(user_id: UUID, role: str):
     return create_token(user_id, role, timedelta(minutes=JWT_ACCESS_TOKEN_EXP), "access")
 
-def create_refresh_token(user_id: UUID, role: str):
-    return create_token(user_id, role, timedelta(days=JWT_REFRESH_TOKEN_EXP), "refresh")
+def create_refresh_token(user_id: UUID, role: str, family: str | None = None):
+    return create_token(user_id, role, timedelta(days=JWT_REFRESH_TOKEN_EXP), "refresh", family)
 
 def decode_token(token: str):
     try:
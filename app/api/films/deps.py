@@ -0,0 +1,22 @@
+from typing import Literal
+
+from fastapi import Query
+
+from app.enums import FilmStatus, FilmType
+
+def film_filter_params(
+    genre: list[str] | None = Query(None, description="Only films with every listed genre"),
+    film_type: FilmType | None = None,
+    air_status: FilmStatus | None = None,
+    year_from: int | None = Query(None, ge=1, le=9999, description="Earliest release year"),
+    year_to: int | None = Query(None, ge=1, le=9999, description="Latest release year"),
+    sort: Literal["newest", "rating", "popularity"] = "newest",
+):
+    return {
+        "genres": genre or [],
+        "film_type": film_type,
+        "air_status": air_status,
+        "year_from": year_from,
+        "year_to": year_to,
+        "sort": sort,
+    }
@@ -0,0 +1,190 @@
+import csv
+import time
+from datetime import datetime
+from itertools import islice
+from typing import IO, Iterator
+from uuid import uuid4
+
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import select, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from decouple import config
+
+from app.db.db import db_session
+from app.db.models import Film, Genre, GenreFilm
+from app.enums import FilmStatus, FilmType
+from .schemas import FilmCreate, FilmImportError, FilmImportReport
+
+# asyncpg sends at most 32767 bind parameters per statement; a batch is one
+# multi-row INSERT, so its size is capped by the number of film columns
+MAX_BIND_PARAMETERS = 32767
+IMPORT_BATCH_SIZE = min(
+    config("IMPORT_BATCH_SIZE", default=1000, cast=int),
+    MAX_BIND_PARAMETERS // len(Film.__table__.columns),
+)
+# the report keeps the first errors only, the count covers all of them
+IMPORT_MAX_REPORTED_ERRORS = config("IMPORT_MAX_REPORTED_ERRORS", default=1000, cast=int)
+IMPORT_FORMATS = ("ndjson", "csv")
+# genres in a CSV cell, e.g. "Drama|Comedy"
+CSV_GENRE_SEPARATOR = "|"
+
+def import_format(file_name: str | None, requested: str | None = None) -> str:
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format '{requested}'")
+        return requested
+    if file_name and file_name.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+class _Lines:
+    # Decodes a binary stream line by line, so invalid UTF-8 only costs the row
+    # it is on. Counts the lines read, the csv reader's line_num stops on errors.
+    def __init__(self, stream: IO[bytes]):
+        self.stream = stream
+        self.line_number = 0
+        self.invalid = False
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.stream:
+            self.line_number += 1
+            try:
+                yield line.decode("utf-8")
+            except UnicodeDecodeError:
+                self.invalid = True
+                yield line.decode("utf-8", errors="replace")
+
+    def take_invalid(self) -> bool:
+        # whether a line read since the last call was not valid UTF-8
+        invalid, self.invalid = self.invalid, False
+        return invalid
+
+_INVALID_UTF8 = "Line is not valid UTF-8"
+
+def _ndjson_rows(stream: IO[bytes]) -> Iterator[tuple[int, str | dict | Exception]]:
+    lines = _Lines(stream)
+    for line in lines:
+        if lines.take_invalid():
+            yield lines.line_number, ValueError(_INVALID_UTF8)
+        elif line.strip():
+            yield lines.line_number, line
+
+def _csv_rows(stream: IO[bytes]) -> Iterator[tuple[int, str | dict | Exception]]:
+    lines = _Lines(stream)
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # bad quoting or an oversized field; the reader resumes on the next line
+            lines.take_invalid()
+            yield lines.line_number, e
+            continue
+        if lines.take_invalid():
+            yield lines.line_number, ValueError(_INVALID_UTF8)
+            continue
+        row = {key: value or None for key, value in row.items()}
+        if row.get("genres"):
+            row["genres"] = [name.strip() for name in row["genres"].split(CSV_GENRE_SEPARATOR) if name.strip()]
+        yield lines.line_number, row
+
+def _parse_row(raw: str | dict, genre_ids: dict[str, int], now: datetime) -> tuple[dict, list[dict]]:
+    film = FilmCreate.model_validate_json(raw) if isinstance(raw, str) else FilmCreate.model_validate(raw)
+    film_id = uuid4()
+    links = []
+    for genre in dict.fromkeys(film.genres or []):
+        if genre not in genre_ids:
+            raise ValueError(f"Genre '{genre}' does not exist")
+        links.append({"film_id": film_id, "genre_id": genre_ids[genre]})
+    row = {
+        "id": film_id,
+        "title": film.title,
+        "synopsis": film.synopsis,
+        "release_date": film.release_date,
+        "air_status": FilmStatus(film.air_status),
+        "film_type": FilmType(film.film_type),
+        "episode_count": film.episode_count,
+        "rating_sum": 0,
+        "rating_count": 0,
+        "created_at": now,
+        "last_updated_at": now,
+    }
+    return row, links
+
+async def _insert_batch(rows: list[dict], links: list[dict], session: AsyncSession):
+    # one multi-row INSERT for the films; a film can have many genres, so the
+    # links are split to stay under the bind parameter limit
+    await session.exec(insert(Film).values(rows))
+    links_per_statement = MAX_BIND_PARAMETERS // len(GenreFilm.__table__.columns)
+    for start in range(0, len(links), links_per_statement):
+        await session.exec(insert(GenreFilm).values(links[start:start + links_per_statement]))
+    await session.commit()
+
+async def import_films(
+    stream: IO[bytes], file_format: str,
+    session: AsyncSession = Depends(db_session),
+) -> FilmImportReport:
+    # Loads films in batches, one transaction per batch. Invalid rows are reported
+    # and skipped; they never abort the rest of the load.
+    started = time.perf_counter()
+    result = await session.exec(select(Genre.genre_name, Genre.id))
+    genre_ids = dict(result.all())
+
+    rows_iter = _csv_rows(stream) if file_format == "csv" else _ndjson_rows(stream)
+    imported = failed = 0
+    errors: list[FilmImportError] = []
+
+    def record_error(line: int, error: Exception | str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+            errors.append(FilmImportError(line=line, error=str(error)))
+
+    while True:
+        # reading and parsing the file is blocking, keep it off the event loop
+        batch = await run_in_threadpool(lambda: list(islice(rows_iter, IMPORT_BATCH_SIZE)))
+        if not batch:
+            break
+        now = datetime.now()
+        parsed = []
+        for line, raw in batch:
+            if isinstance(raw, Exception):
+                record_error(line, raw)
+                continue
+            try:
+                parsed.append((line, *_parse_row(raw, genre_ids, now)))
+            except ValueError as e:
+                record_error(line, e)
+        if not parsed:
+            continue
+
+        try:
+            await _insert_batch(
+                [row for _, row, _ in parsed],
+                [link for _, _, links in parsed for link in links],
+                session,
+            )
+            imported += len(parsed)
+        except SQLAlchemyError:
+            # retry the batch row by row so only the offending rows are lost
+            await session.rollback()
+            for line, row, links in parsed:
+                try:
+                    await _insert_batch([row], links, session)
+                    imported += 1
+                except SQLAlchemyError as e:
+                    await session.rollback()
+                    record_error(line, getattr(e, "orig", None) or e)
+
+    seconds = time.perf_counter() - started
+    return FilmImportReport(
+        imported=imported,
+        failed=failed,
+        seconds=round(seconds, 3),
+        rows_per_second=round(imported / seconds, 1) if seconds else 0.0,
+        errors=errors,
+    )
@@ -1,26 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, Form, Query
 from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Annotated
 from pydantic import TypeAdapter
 
-from app.db.db import db_session
+from app.db.db import db_session, db_read_session
 from app.api.response_code import common_responses
-from app.deps.pagination import pagination_params
+from app.deps.pagination import pagination_params, CursorPage
 from app.enums import Role
 from app.api.auth.deps import require_role
 from uuid import UUID
 
-from .service import create_film, get_film_by_id, get_all_film, search_film_by_title
-from .schemas import FilmCreate, FilmSummary, FilmDetail
+from app.api.images.derivatives import generate_film_image_variants
+from .service import create_film, get_film_by_id, get_all_film, get_genre_facets, search_film_by_title
+from .deps import film_filter_params
+from .importer import import_films, import_format
+from .schemas import FilmCreate, FilmSummary, FilmDetail, FilmImportReport, GenreFacet
 
 router = APIRouter(prefix="/films", tags=["Films"])
 @router.get(
     "/search",
-    response_model=list[FilmSummary],
+    response_model=list[FilmSummary] | CursorPage[FilmSummary],
     responses={500: {**common_responses[500]}})
 async def search_films(
     title: str,
-    session: AsyncSession = Depends(db_session),
+    session: AsyncSession = Depends(db_read_session),
     pagination: dict = Depends(pagination_params)
 ):
     films = await search_film_by_title(title, pagination, session)        
@@ -45,32 +48,101 @@ async def search_films(
 )
 async def add_new_film(
     film: Annotated[str, Form()], images: list[UploadFile],
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(db_session),
     _: str = Depends(require_role(Role.ADMIN))
 ):
     try:
         film_data = TypeAdapter(FilmCreate).validate_json(film)
         
-        await create_film(film_data, images, session)
+        new_film = await create_film(film_data, images, session)
+        background_tasks.add_task(generate_film_image_variants, new_film.id)
         return {"message": "Film created successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post(
+    "/import",
+    response_model=FilmImportReport,
+    responses={
+        400: {**common_responses[400], "content": {
+            "application/json": {
+                "example": {
+                    "detail": "Unsupported import format '{format}'"
+                }
+            }
+        }},
+        401: {**common_responses[401]},
+        403: {**common_responses[403]},
+        500: {**common_responses[500]}
+    }
+)
+async def import_film_catalog(
+    file: UploadFile,
+    requested_format: str | None = Query(default=None, alias="format"),
+    session: AsyncSession = Depends(db_session),
+    _: str = Depends(require_role(Role.ADMIN))
+):
+    # NDJSON (one FilmCreate object per line) or CSV with a header row
+    try:
+        file_format = import_format(file.filename, requested_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # the importer decodes line by line so bad bytes only fail their row
+        return await import_films(file.file, file_format, session)
+    finally:
+        await file.close()
+
 @router.get(
     "",
-    response_model=list[FilmSummary],
+    response_model=list[FilmSummary] | CursorPage[FilmSummary],
     responses={
+        400: {**common_responses[400], "content": {
+            "application/json": {
+                "example": {
+                    "detail": "Genre '{genre_name}' does not exist"
+                }
+            }
+        }},
         500: {**common_responses[500]}
     },
 )
 async def get_film_list(
     pagination: dict = Depends(pagination_params),
-    session: AsyncSession = Depends(db_session)
+    filters: dict = Depends(film_filter_params),
+    session: AsyncSession = Depends(db_read_session)
 ):
-    films = await get_all_film(pagination, session)
+    try:
+        films = await get_all_film(pagination, filters, session)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
         
     return films
 
+@router.get(
+    "/facets",
+    response_model=list[GenreFacet],
+    responses={
+        400: {**common_responses[400], "content": {
+            "application/json": {
+                "example": {
+                    "detail": "Genre '{genre_name}' does not exist"
+                }
+            }
+        }},
+        500: {**common_responses[500]}
+    },
+)
+async def get_film_facets(
+    filters: dict = Depends(film_filter_params),
+    session: AsyncSession = Depends(db_read_session)
+):
+    try:
+        return await get_genre_facets(filters, session)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get(
     "/{film_id}",
     response_model=FilmDetail,
@@ -87,6 +159,8 @@ async def get_film_list(
 )    
 async def get_film_details(
     film_id: UUID,
+    # the primary: a miss fills the shared detail cache, and a lagging replica
+    # would put back what a review write just invalidated
     session: AsyncSession = Depends(db_session),
 ):
     try:
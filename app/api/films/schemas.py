@@ -9,7 +9,6 @@ class FilmCreate(BaseModel):
     air_status: str
     film_type: str
     episode_count: int | None = None
-    rating: float | None = None
     genres: list[str] | None = None
     
 class FilmSummary(BaseModel):
@@ -22,6 +21,13 @@ class FilmSummary(BaseModel):
     rating: float | None = None
     cover_image: str | None = None
     
+class FilmReviewStatsResponse(BaseModel):
+    review_count: int = 0
+    # rating (1-10) -> number of reviews with that rating
+    rating_histogram: dict[int, int]
+    like_total: int = 0
+    dislike_total: int = 0
+
 class FilmDetail(BaseModel):
     title: str
     synopsis: str | None = None
@@ -33,4 +39,19 @@ class FilmDetail(BaseModel):
     rating_count: int | None = None
     genres: list[str] | None = None
     images: list[str] | None = None
-    
\ No newline at end of file
+    review_stats: FilmReviewStatsResponse | None = None
+    
+class FilmImportError(BaseModel):
+    line: int
+    error: str
+
+class FilmImportReport(BaseModel):
+    imported: int
+    failed: int
+    seconds: float
+    rows_per_second: float
+    errors: list[FilmImportError]
+
+class GenreFacet(BaseModel):
+    genre: str
+    count: int
@@ -1,29 +1,49 @@
+import asyncio
+from datetime import date
 from fastapi import Depends, UploadFile
-from sqlmodel import select,func
+from sqlmodel import select,func,update
+from sqlalchemy import JSON, Float, cast
 
 from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
 
 from app.db.db import db_session
-from app.db.models import Film, Genre, GenreFilm
-from app.api.images.service import upload_image, get_movie_image_by_id, get_cover_image
-from .schemas import FilmCreate, FilmSummary, FilmDetail
+from app.cache import film_detail_cache
+from app.deps.pagination import CursorPage, check_cursor_sort, paginate, page_rows, build_page
+from app.db.models import Film, FilmReviewStats, Genre, GenreFilm, Image, Review, film_average_rating, film_popularity
+from app.api.genres.service import resolve_genre_ids
+from app.api.images.service import upload_image, register_image_blobs, store_image_files, discard_image_files, image_url, get_cover_images
+from .schemas import FilmCreate, FilmSummary, FilmDetail, FilmReviewStatsResponse, GenreFacet
 from app.enums import FilmStatus, FilmType
 
+FILM_SORT_KEYS = {
+    "newest": Film.created_at,
+    "rating": film_average_rating,
+    "popularity": film_popularity,
+}
+
+def average_rating(film: Film) -> float | None:
+    if not film.rating_count:
+        return None
+    return round(film.rating_sum / film.rating_count, 2)
+
+def _to_review_stats(stats: FilmReviewStats | None) -> FilmReviewStatsResponse:
+    if stats is None:
+        # no review has been written for the film yet
+        stats = FilmReviewStats()
+    return FilmReviewStatsResponse(
+        review_count=stats.review_count,
+        rating_histogram={rating: getattr(stats, f"rating_{rating}") for rating in range(1, 11)},
+        like_total=stats.like_total,
+        dislike_total=stats.dislike_total,
+    )
 
 async def create_film(
     film: FilmCreate, images: list[UploadFile],
     session: AsyncSession = Depends(db_session), 
 ) -> Film:
      
-    genre_ids = []
-    for genre in film.genres:
-        result = await session.exec(select(Genre).where(Genre.genre_name == genre))
-        existing_genre = result.first()
-        if not existing_genre:
-            raise ValueError(f"Genre '{genre}' does not exist")
-        else:
-            genre_ids.append(existing_genre.id)
+    genre_ids = await resolve_genre_ids(film.genres or [], session)
     #db_film = Film.model_validate(film)
     db_film = Film(
         title=film.title,
@@ -32,45 +52,77 @@ async def create_film(
         air_status=FilmStatus(film.air_status),
         film_type=FilmType(film.film_type),
         episode_count=film.episode_count,
-        rating=film.rating,
     )
     
     session.add(db_film)
     await session.flush() 
     session.add_all(
-        GenreFilm(film_id=db_film.id, genre_id=genre_id) for genre_id in genre_ids
+        GenreFilm(film_id=db_film.id, genre_id=genre_id) for genre_id in genre_ids.values()
     )
     
-    cover_image = images[0] if images else None
-    if cover_image:
-        new_cover = await upload_image(cover_image, db_film.id, True, session)
-        session.add(new_cover)
-    for image in images[1:]:
-        if image:
-            new_image = await upload_image(image, db_film.id, False, session)
-            session.add(new_image)
-    
-    await session.commit()
+    # the first image is the cover; all images are streamed to disk concurrently
+    uploads = await asyncio.gather(
+        *(upload_image(image, db_film.id, index == 0, session) for index, image in enumerate(images) if image),
+        return_exceptions=True,
+    )
+    uploaded = [upload for upload in uploads if not isinstance(upload, BaseException)]
+    new_images = [new_image for new_image, _ in uploaded]
+    try:
+        for upload in uploads:
+            if isinstance(upload, BaseException):
+                raise upload
+        # the files are placed while the upsert holds the blob rows
+        await register_image_blobs(new_images, session)
+        await store_image_files(uploaded)
+        session.add_all(new_images)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        await discard_image_files(uploaded, session)
+        raise
     await session.refresh(db_film)
+    await film_detail_cache.delete(str(db_film.id))
     return db_film
 
 async def get_film_by_id(
     film_id: UUID,
     session: AsyncSession = Depends(db_session),
 ) -> FilmDetail | None:
-    exist = select(Film).where(Film.id == film_id)
-    result = await session.exec(exist)
-    film = result.first()
-    print(film)
+    cached = await film_detail_cache.get(str(film_id))
+    if cached is not None:
+        return FilmDetail.model_validate(cached)
+
+    # query budget: one round trip (none on a cache hit); genres and images
+    # are aggregated per film into JSON arrays in correlated subqueries
+    genres = (
+        select(func.json_agg(Genre.genre_name, type_=JSON))
+        .join(GenreFilm)
+        .where(GenreFilm.film_id == Film.id)
+        .scalar_subquery()
+    )
+    images = (
+        select(func.json_agg(func.json_build_object(
+            "image_id", Image.image_id,
+            "content_hash", Image.content_hash,
+            "image_extension", Image.image_extension,
+        ), type_=JSON))
+        .where(Image.film_id == Film.id)
+        .scalar_subquery()
+    )
+    statement = (
+        select(Film, FilmReviewStats, genres, images)
+        .outerjoin(FilmReviewStats, FilmReviewStats.film_id == Film.id)
+        .where(Film.id == film_id)
+    )
+    result = await session.exec(statement)
+    row = result.first()
     
-    if not film:
+    if not row:
         raise ValueError(f"Film with id {film_id} does not exist")
     
-    statement = select(Genre.genre_name).join(GenreFilm).where(GenreFilm.film_id == film.id)
-    result = await session.exec(statement)
-    genres = result.all()
-    
-    images = await get_movie_image_by_id(film_id, session)
+    film, stats, genres, images = row
+    # inside JSON the image id is plain text
+    images = [image_url(Image(**{**image, "image_id": UUID(image["image_id"])})) for image in images or []]
     film = FilmDetail(
         title=film.title,
         synopsis=film.synopsis,
@@ -78,57 +130,119 @@ async def get_film_by_id(
         air_status=film.air_status,
         film_type=film.film_type,
         episode_count=film.episode_count,
-        rating=round(film.rating, 2) if film.rating is not None else None,
+        rating=average_rating(film),
         rating_count=film.rating_count,
-        genres=genres,
+        genres=genres or [],
         images=images,
+        review_stats=_to_review_stats(stats),
     )
+    await film_detail_cache.set(str(film_id), film.model_dump(mode="json"))
     return film
         
 
+def _to_film_summary(film: Film, cover_image: str | None) -> FilmSummary:
+    return FilmSummary(
+        id=film.id,
+        title=film.title,
+        release_date=film.release_date,
+        air_status=film.air_status,
+        film_type=film.film_type,
+        episode_count=film.episode_count,
+        rating=average_rating(film),
+        cover_image=cover_image,
+    )
+
+async def _filter_films(statement, filters: dict, session: AsyncSession):
+    if filters["genres"]:
+        genre_ids = await resolve_genre_ids(filters["genres"], session)
+        for genre_id in genre_ids.values():
+            statement = statement.where(
+                Film.id.in_(select(GenreFilm.film_id).where(GenreFilm.genre_id == genre_id))
+            )
+    if filters["film_type"] is not None:
+        statement = statement.where(Film.film_type == filters["film_type"])
+    if filters["air_status"] is not None:
+        statement = statement.where(Film.air_status == filters["air_status"])
+    if filters["year_from"] is not None:
+        statement = statement.where(Film.release_date >= date(filters["year_from"], 1, 1))
+    if filters["year_to"] is not None:
+        statement = statement.where(Film.release_date <= date(filters["year_to"], 12, 31))
+    return statement
+
 async def get_all_film(
     pagination: dict,
+    filters: dict,
     session: AsyncSession = Depends(db_session),
-) -> list[FilmSummary]:
-    statement = select(Film).offset(pagination["offset"]).limit(pagination["limit"])
+) -> list[FilmSummary] | CursorPage[FilmSummary]:
+    # query budget: two round trips, the page and its cover images
+    sort_key = FILM_SORT_KEYS[filters["sort"]]
+    check_cursor_sort(pagination, filters["sort"])
+    # the sort key is selected so the cursor carries the exact value the database compares
+    statement = await _filter_films(select(Film, sort_key), filters, session)
+    statement = paginate(statement, pagination, sort_key, Film.id)
     result = await session.exec(statement)
-    films = result.all()
+    rows, next_cursor = page_rows(result.all(), pagination, lambda row: (row[1], row[0].id), filters["sort"])
+    films = [film for film, _ in rows]
     
-    film_summaries = []
-    for film in films:
-        film_summary = FilmSummary(
-            id=film.id,
-            title=film.title,
-            release_date=film.release_date,
-            air_status=film.air_status,
-            film_type=film.film_type,
-            episode_count=film.episode_count,
-            rating=round(film.rating, 2) if film.rating is not None else None,
-            cover_image= await get_cover_image(film.id, session),
-        )
-        film_summaries.append(film_summary)
-            
-    return film_summaries
+    covers = await get_cover_images([film.id for film in films], session)
+    film_summaries = [_to_film_summary(film, covers.get(film.id)) for film in films]
+    return build_page(film_summaries, pagination, next_cursor)
+
+async def get_genre_facets(
+    filters: dict,
+    session: AsyncSession = Depends(db_session),
+) -> list[GenreFacet]:
+    # film count per genre among the films matching the filters, in one aggregate query
+    films = await _filter_films(select(Film.id), filters, session)
+    film_count = func.count(GenreFilm.film_id)
+    statement = (
+        select(Genre.genre_name, film_count)
+        .join(GenreFilm, GenreFilm.genre_id == Genre.id)
+        .where(GenreFilm.film_id.in_(films))
+        .group_by(Genre.id, Genre.genre_name)
+        .order_by(film_count.desc(), Genre.genre_name)
+    )
+    result = await session.exec(statement)
+    return [GenreFacet(genre=genre, count=count) for genre, count in result.all()]
 
 async def search_film_by_title(
     title: str,
     pagination: dict,
     session: AsyncSession = Depends(db_session),
-) -> list[FilmSummary]:
-    statement = select(Film).where(func.lower(Film.title).contains(title.lower())).offset(pagination["offset"]).limit(pagination["limit"])
+) -> list[FilmSummary] | CursorPage[FilmSummary]:
+    # query budget: two round trips, the page and its cover images
+    query = title.lower()
+    check_cursor_sort(pagination, "relevance")
+    # best matches first (pg_trgm), in offset and keyset mode alike; the LIKE
+    # predicate is what the GIN index on lower(title) serves
+    relevance = cast(func.similarity(func.lower(Film.title), query), Float)
+    statement = (
+        select(Film, relevance)
+        .where(func.lower(Film.title).contains(query, autoescape=True))
+    )
+    statement = paginate(statement, pagination, relevance, Film.id)
     result = await session.exec(statement)
-    films = result.all()
-    film_summaries = []
-    for film in films:
-        film_summary = FilmSummary(
-            id=film.id,
-            title=film.title,
-            release_date=film.release_date,
-            air_status=film.air_status,
-            film_type=film.film_type,
-            episode_count=film.episode_count,
-            rating=round(film.rating, 2) if film.rating is not None else None,
-        )
-        film_summaries.append(film_summary)
-            
-    return film_summaries
\ No newline at end of file
+    rows, next_cursor = page_rows(result.all(), pagination, lambda row: (row[1], row[0].id), "relevance")
+    films = [film for film, _ in rows]
+
+    covers = await get_cover_images([film.id for film in films], session)
+    film_summaries = [_to_film_summary(film, covers.get(film.id)) for film in films]
+    return build_page(film_summaries, pagination, next_cursor)
+
+async def reconcile_film_ratings(session: AsyncSession = Depends(db_session)) -> int:
+    # rebuild every film's rating aggregate from its reviews in one statement
+    rating_sum = (
+        select(func.coalesce(func.sum(Review.rating), 0))
+        .where(Review.film_id == Film.id)
+        .scalar_subquery()
+    )
+    rating_count = (
+        select(func.count(Review.id))
+        .where(Review.film_id == Film.id)
+        .scalar_subquery()
+    )
+    result = await session.exec(
+        update(Film).values(rating_sum=rating_sum, rating_count=rating_count)
+    )
+    await session.commit()
+    return result.rowcount
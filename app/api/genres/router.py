@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db.db import db_session
 from app.api.auth.deps import require_role
 from app.db.models import Genre
-from .service import create_genre, get_all_genres, update_genre_by_id
+from .service import create_genre, get_genre_catalog, update_genre_by_id
 from .schemas import CreateGenre
 from app.enums import Role
 from app.exceptions import UniqueConstraintViolation
 
 from app.api.response_code import common_responses
+from app.deps.conditional import etag_matches
 
 router = APIRouter(prefix="/genres", tags=["Genres"])
 
@@ -34,14 +35,19 @@ async def add_new_genre(
     except UniqueConstraintViolation as e:
         raise HTTPException(status_code=409, detail=str(e))
 
-@router.get("", response_model=list[Genre], responses={500: {**common_responses[500]}})
+@router.get("", response_model=list[Genre], responses={304: {"description": "Not Modified"}, 500: {**common_responses[500]}})
 async def get_genres(
+    request: Request,
     session: AsyncSession = Depends(db_session)
 ):
-    try:
-        return await get_all_genres(session)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    # the primary: a snapshot rebuilt from a lagging replica right after a genre
+    # write would cache the old list for GENRE_CACHE_TTL. Cache hits don't query.
+    etag, body = await get_genre_catalog(session)
+    # clients and CDNs revalidate every time, and skip the body while it is unchanged
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.patch("/{genre_id}", response_model=Genre,
@@ -1,10 +1,63 @@
+import hashlib
+import json
+import time
+
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import Depends
+from decouple import config
 from app.db.db import db_session
+from app.cache import LRUCache, film_detail_cache
 from app.db.models import Genre
 from .schemas import CreateGenre
 from app.exceptions import UniqueConstraintViolation
+
+GENRE_CACHE_SIZE = config("GENRE_CACHE_SIZE", default=1024, cast=int)
+# genres rarely change; the TTL bounds how long other workers see a renamed genre
+GENRE_CACHE_TTL = config("GENRE_CACHE_TTL", default=300, cast=int)
+_genre_ids = LRUCache(maxsize=GENRE_CACHE_SIZE, ttl=GENRE_CACHE_TTL)
+# (etag, serialized genre list, built at); rebuilt after genre writes
+_catalog: tuple[str, bytes, float] | None = None
+
+def _invalidate_genres():
+    global _catalog
+    _catalog = None
+    _genre_ids.clear()
+
+async def get_genre_catalog(session: AsyncSession = Depends(db_session)) -> tuple[str, bytes]:
+    # The whole genre list pre-serialized, with an ETag derived from its content so
+    # every worker holding the same genres hands out the same version.
+    global _catalog
+    if _catalog is None or time.monotonic() - _catalog[2] > GENRE_CACHE_TTL:
+        result = await session.exec(select(Genre).order_by(Genre.id))
+        body = json.dumps(
+            [genre.model_dump() for genre in result.all()], separators=(",", ":")
+        ).encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        _catalog = (etag, body, time.monotonic())
+    etag, body, _ = _catalog
+    return etag, body
+
+async def resolve_genre_ids(names: list[str], session: AsyncSession = Depends(db_session)) -> dict[str, int]:
+    # name -> id for every name, one IN query for the names not cached yet
+    ids = {}
+    missing = []
+    for name in dict.fromkeys(names):
+        genre_id = _genre_ids.get(name)
+        if genre_id is None:
+            missing.append(name)
+        else:
+            ids[name] = genre_id
+    if missing:
+        result = await session.exec(select(Genre.genre_name, Genre.id).where(Genre.genre_name.in_(missing)))
+        for name, genre_id in result.all():
+            _genre_ids.set(name, genre_id)
+            ids[name] = genre_id
+    for name in missing:
+        if name not in ids:
+            raise ValueError(f"Genre '{name}' does not exist")
+    return ids
+
 async def create_genre(genre: CreateGenre, session: AsyncSession = Depends(db_session)) -> Genre:
     result = await session.exec(select(Genre).where(Genre.genre_name == genre.genre_name))
     existing = result.first()
@@ -16,6 +69,7 @@ async def create_genre(genre: CreateGenre, session: AsyncSession = Depends(db_se
     session.add(new_genre)
     await session.commit()
     await session.refresh(new_genre)
+    _invalidate_genres()
     return new_genre
 
 async def get_genre_by_id(genre_id: int, session: AsyncSession = Depends(db_session)) -> Genre:
@@ -44,5 +98,9 @@ async def update_genre_by_id(genre: Genre, session: AsyncSession = Depends(db_se
     existing_genre.genre_name = genre.genre_name
     await session.commit()
     await session.refresh(existing_genre)
+    _invalidate_genres()
+    # cached film details list genres by name; any number of films can carry
+    # this one and renames are rare, so drop them all
+    await film_detail_cache.clear()
     return existing_genre
 
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from uuid import UUID
+
+from decouple import config
+from sqlmodel import select
+
+from app.db.db import async_session
+from app.db.models import Image, ImageVariant
+from .service import IMAGE_PATH, image_file_path, image_stem, variant_file_name
+
+try:
+    from PIL import Image as PILImage, features
+except ImportError:  # Pillow is optional, without it no variants are generated
+    PILImage = None
+
+IMAGE_VARIANT_WORKERS = config("IMAGE_VARIANT_WORKERS", default=2, cast=int)
+logger = logging.getLogger(__name__)
+THUMBNAIL_SIZE = (320, 480)
+
+# name -> (bounding box or None for original size, Pillow format, content type)
+VARIANTS = {
+    "thumb": (THUMBNAIL_SIZE, "WEBP", "image/webp"),
+    "webp": (None, "WEBP", "image/webp"),
+}
+if PILImage is not None and features.check("avif"):
+    VARIANTS["avif"] = (None, "AVIF", "image/avif")
+
+_executor: ProcessPoolExecutor | None = None
+
+def _render_variants(source: str, targets: list[tuple[str, str, tuple | None, str]]) -> list[tuple[str, int, int]]:
+    # runs in a worker process; resizing is CPU bound
+    rendered = []
+    with PILImage.open(source) as original:
+        original.load()
+        for name, path, size, image_format in targets:
+            if os.path.exists(path):
+                # same content uploaded before, its variants are already on disk
+                with PILImage.open(path) as variant:
+                    rendered.append((name, variant.width, variant.height))
+                continue
+            variant = original.copy()
+            if size is not None:
+                variant.thumbnail(size)
+            if variant.mode not in ("RGB", "RGBA"):
+                variant = variant.convert("RGBA")
+            temp_path = path + ".part"
+            variant.save(temp_path, format=image_format)
+            os.replace(temp_path, path)
+            rendered.append((name, variant.width, variant.height))
+    return rendered
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn, not fork: forking the multi-threaded server process can copy a
+        # lock held by another thread into the child and deadlock it
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_VARIANT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+async def _generate_for_image(image: Image, existing: set[str]) -> list[ImageVariant]:
+    targets = [
+        (name, os.path.join(IMAGE_PATH, variant_file_name(image_stem(image), name, content_type)), size, image_format)
+        for name, (size, image_format, content_type) in VARIANTS.items()
+        if name not in existing
+    ]
+    if not targets:
+        return []
+    loop = asyncio.get_running_loop()
+    rendered = await loop.run_in_executor(
+        _get_executor(), _render_variants, str(image_file_path(image)), targets
+    )
+    return [
+        ImageVariant(
+            image_id=image.image_id,
+            variant=name,
+            image_extension=VARIANTS[name][2],
+            width=width,
+            height=height,
+        )
+        for name, width, height in rendered
+    ]
+
+async def generate_film_image_variants(film_id: UUID):
+    # Background task: runs after the response with its own session.
+    if PILImage is None:
+        return
+    async with async_session() as session:
+        result = await session.exec(select(Image).where(Image.film_id == film_id))
+        images = result.all()
+        result = await session.exec(
+            select(ImageVariant.image_id, ImageVariant.variant)
+            .where(ImageVariant.image_id.in_([image.image_id for image in images]))
+        )
+        existing: dict[UUID, set[str]] = {}
+        for image_id, variant in result.all():
+            existing.setdefault(image_id, set()).add(variant)
+
+        generated = await asyncio.gather(
+            *(_generate_for_image(image, existing.get(image.image_id, set())) for image in images),
+            return_exceptions=True,
+        )
+        # an unreadable image only loses its own variants
+        for image, variants in zip(images, generated):
+            if isinstance(variants, BaseException):
+                logger.error(
+                    "Generating variants failed for image %s of film %s",
+                    image.image_id, film_id, exc_info=variants,
+                )
+            else:
+                session.add_all(variants)
+        await session.commit()
@@ -0,0 +1,56 @@
+import mimetypes
+import os
+import pathlib
+import re
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from decouple import config
+
+from app.api.response_code import common_responses
+from app.deps.conditional import etag_matches
+from .service import IMAGE_PATH
+
+IMAGE_CACHE_MAX_AGE = config("IMAGE_CACHE_MAX_AGE", default=31536000, cast=int)
+LEGACY_IMAGE_CACHE_MAX_AGE = config("LEGACY_IMAGE_CACHE_MAX_AGE", default=86400, cast=int)
+
+# <stem>[_<variant>].<ext> with an image extension; anything else, including path
+# separators and the .part files of uploads still being written, is a 404
+_FILE_NAME = re.compile(r"(?P<stem>[0-9A-Za-z-]+)(?:_(?P<variant>[a-z]+))?\.(?P<ext>jpeg|jpg|png|gif|webp|avif)")
+_CONTENT_HASH = re.compile(r"[0-9a-f]{64}")
+_MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+router = APIRouter(prefix="/images", tags=["Images"])
+
+@router.get(
+    "/{file_name}",
+    response_class=FileResponse,
+    responses={304: {"description": "Not Modified"}, 404: {**common_responses[404]}},
+)
+async def get_image(file_name: str, request: Request):
+    match = _FILE_NAME.fullmatch(file_name)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = pathlib.Path(IMAGE_PATH) / file_name
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    if _CONTENT_HASH.fullmatch(match["stem"]):
+        # the name is derived from the bytes, so the file never changes under it
+        etag = f'"{file_name.rsplit(".", 1)[0]}"'
+        cache_control = f"public, max-age={IMAGE_CACHE_MAX_AGE}, immutable"
+    else:
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        cache_control = f"public, max-age={LEGACY_IMAGE_CACHE_MAX_AGE}"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse handles Range/If-Range and uses the ASGI pathsend extension
+    # (sendfile) when the server supports it
+    media_type = _MEDIA_TYPES.get(match["ext"]) or mimetypes.guess_type(file_name)[0]
+    return FileResponse(path, headers=headers, media_type=media_type, stat_result=stat_result)
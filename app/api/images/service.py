@@ -1,40 +1,183 @@
+from collections import Counter
 from uuid import UUID, uuid4
+import hashlib
+import os
 import pathlib
 
 from fastapi import Depends, UploadFile
-from sqlmodel import select
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel.ext.asyncio.session import AsyncSession
 from decouple import config
 
 from app.db.db import db_session
-from app.db.models import Image
+from app.cache import film_detail_cache
+from app.db.models import Image, ImageBlob, ImageVariant
 
 IMAGE_PATH = config("IMAGE_PATH")
-async def upload_image(image: UploadFile, film_id: UUID, is_cover: bool | None, session: AsyncSession = Depends(db_session)):
-    random_name = uuid4()
-    extension = "".join(pathlib.Path(image.filename).suffixes)
+# public URL the image route is mounted under; IMAGE_PATH is only the directory on disk
+IMAGE_URL_PREFIX = config("IMAGE_URL_PREFIX", default="/api/images")
+IMAGE_MAX_SIZE = config("IMAGE_MAX_SIZE", default=10 * 1024 * 1024, cast=int)
+UPLOAD_CHUNK_SIZE = 256 * 1024
+COVER_VARIANT = "thumb"
 
-    path = pathlib.Path(f"{IMAGE_PATH}/{str(random_name)}{extension}")
-    print(path)
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+def sniff_content_type(head: bytes) -> str | None:
+    # trust the file's magic bytes, not the client supplied content type
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def image_stem(image: Image) -> str:
+    # content addressed images are named by hash; older uploads by image_id
+    return image.content_hash or str(image.image_id)
+
+def image_file_name(image: Image) -> str:
+    return f"{image_stem(image)}.{image.image_extension.split('/')[1]}"
+
+def image_url(image: Image) -> str:
+    return f"{IMAGE_URL_PREFIX}/{image_file_name(image)}"
+
+def image_file_path(image: Image) -> pathlib.Path:
+    return pathlib.Path(IMAGE_PATH) / image_file_name(image)
+
+def variant_file_name(stem: str, variant: str, content_type: str) -> str:
+    return f"{stem}_{variant}.{content_type.split('/')[1]}"
+
+def variant_url(image: Image, variant: ImageVariant) -> str:
+    return f"{IMAGE_URL_PREFIX}/{variant_file_name(image_stem(image), variant.variant, variant.image_extension)}"
+
+def variant_file_path(image: Image, variant: ImageVariant) -> pathlib.Path:
+    return pathlib.Path(IMAGE_PATH) / variant_file_name(image_stem(image), variant.variant, variant.image_extension)
+
+async def upload_image(image: UploadFile, film_id: UUID, is_cover: bool | None, session: AsyncSession = Depends(db_session)) -> tuple[Image, pathlib.Path]:
+    # Returns the new Image and the temp file holding its bytes. Nothing is
+    # deduplicated here: store_image_files moves the file into place once
+    # register_image_blobs holds the blob row lock.
     try:
-        with path.open("wb") as buffer:
-            buffer.write(image.file.read())
-    except:
-        raise TypeError()
+        head = await image.read(UPLOAD_CHUNK_SIZE)
+        content_type = sniff_content_type(head)
+        if content_type is None:
+            raise TypeError(f"File '{image.filename}' is not a supported image")
+
+        # stream to a temp file while hashing, then rename to the content hash
+        temp_path = pathlib.Path(IMAGE_PATH) / f"{uuid4()}.part"
+        buffer = await run_in_threadpool(temp_path.open, "wb")
+        hasher = hashlib.sha256()
+
+        def write_chunk(chunk: bytes):
+            hasher.update(chunk)
+            buffer.write(chunk)
+
+        try:
+            size = 0
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > IMAGE_MAX_SIZE:
+                    raise ValueError(f"File '{image.filename}' is larger than {IMAGE_MAX_SIZE} bytes")
+                await run_in_threadpool(write_chunk, chunk)
+                chunk = await image.read(UPLOAD_CHUNK_SIZE)
+            await run_in_threadpool(buffer.close)
+
+            new_image = Image(
+                image_id=uuid4(),
+                film_id=film_id,
+                image_extension=content_type,
+                is_cover=is_cover,
+                content_hash=hasher.hexdigest(),
+            )
+        except Exception:
+            buffer.close()
+            temp_path.unlink(missing_ok=True)
+            raise
     finally:
-        image.file.close()
-        
-    new_image = Image(
-        image_id=random_name,
-        film_id=film_id,
-        image_extension=image.content_type,
-        is_cover=is_cover,
+        await image.close()
+
+    return new_image, temp_path
+
+# An ImageBlob row lock guards its file: files are only placed or unlinked by a
+# transaction holding the lock, and unlinked only when ref_count drops to zero.
+
+async def register_image_blobs(images: list[Image], session: AsyncSession = Depends(db_session)):
+    # one upsert adds a reference per image, creating blobs seen for the first
+    # time; it also locks the rows until the transaction ends
+    counts = Counter((image.content_hash, image.image_extension) for image in images)
+    if not counts:
+        return
+    statement = insert(ImageBlob).values([
+        {"content_hash": content_hash, "image_extension": extension, "ref_count": count}
+        for (content_hash, extension), count in counts.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["content_hash"],
+        set_={"ref_count": ImageBlob.ref_count + statement.excluded.ref_count},
     )
+    await session.exec(statement)
 
-    return new_image
+async def store_image_files(uploads: list[tuple[Image, pathlib.Path]]):
+    # call with the rows locked by register_image_blobs; the name is the hash of
+    # the bytes, so replacing a file that is already there changes nothing
+    for image, temp_path in uploads:
+        await run_in_threadpool(os.replace, temp_path, image_file_path(image))
+
+async def remove_unused_blob_files(blobs: dict[str, tuple[str, list[pathlib.Path]]], session: AsyncSession = Depends(db_session)):
+    # content hash -> (image extension, files named after it); the files and
+    # the blob row go when no committed image references the content
+    if not blobs:
+        return
+    # a no-op upsert, only to lock the rows (creating them if needed) so no
+    # other upload can register the same content while we look
+    statement = insert(ImageBlob).values([
+        {"content_hash": content_hash, "image_extension": extension, "ref_count": 0}
+        for content_hash, (extension, _) in blobs.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["content_hash"],
+        set_={"ref_count": ImageBlob.ref_count},
+    ).returning(ImageBlob.content_hash, ImageBlob.ref_count)
+    result = await session.exec(statement)
+    unused = [content_hash for content_hash, ref_count in result.all() if ref_count <= 0]
+    for content_hash in unused:
+        for path in blobs[content_hash][1]:
+            await run_in_threadpool(path.unlink, missing_ok=True)
+    if unused:
+        await session.exec(
+            delete(ImageBlob).where(ImageBlob.content_hash.in_(unused), ImageBlob.ref_count <= 0)
+        )
+    await session.commit()
+
+async def discard_image_files(uploads: list[tuple[Image, pathlib.Path]], session: AsyncSession = Depends(db_session)):
+    # after the upload transaction was rolled back: temp files always go, a
+    # stored file only when no committed image references its blob
+    for _, temp_path in uploads:
+        await run_in_threadpool(temp_path.unlink, missing_ok=True)
+    await remove_unused_blob_files(
+        {image.content_hash: (image.image_extension, [image_file_path(image)]) for image, _ in uploads}, session
+    )
+
+async def release_image_blob(content_hash: str, session: AsyncSession = Depends(db_session)) -> bool:
+    # drops one reference; True when it was the last one. The row stays for
+    # remove_unused_blob_files to check again once this is committed.
+    result = await session.exec(
+        update(ImageBlob)
+        .where(ImageBlob.content_hash == content_hash)
+        .values(ref_count=ImageBlob.ref_count - 1)
+        .returning(ImageBlob.ref_count)
+    )
+    remaining = result.scalar()
+    return remaining is not None and remaining <= 0
 
-    
-    
 async def delete_image(image_id: UUID, session: AsyncSession = Depends(db_session)):
     statement = select(Image).where(Image.image_id == image_id)
     result = await session.exec(statement)
@@ -43,16 +186,27 @@ async def delete_image(image_id: UUID, session: AsyncSession = Depends(db_sessio
     if image == None:
         raise FileNotFoundError()
     
-    path = pathlib.Path(f"{IMAGE_PATH}/{str(image.image_id)}{image.image_extension}")
+    result = await session.exec(select(ImageVariant).where(ImageVariant.image_id == image.image_id))
+    variants = result.all()
+    paths = [image_file_path(image), *(variant_file_path(image, variant) for variant in variants)]
     
     await session.delete(image)
-    try:
-        path.unlink()
-    except:
-        await session.rollback()
-        raise FileNotFoundError()
-    
+    await session.flush()
+    last_reference = True
+    if image.content_hash is not None:
+        last_reference = await release_image_blob(image.content_hash, session)
     await session.commit()
+    await film_detail_cache.delete(str(image.film_id))
+
+    # files only go once the delete is committed. The content's files are shared,
+    # so they are removed under a fresh lock of the blob row, and only if no
+    # upload has referenced the content since; a crash in between leaves an
+    # unreferenced blob behind rather than an image without its file.
+    if image.content_hash is None:
+        for path in paths:
+            await run_in_threadpool(path.unlink, missing_ok=True)
+    elif last_reference:
+        await remove_unused_blob_files({image.content_hash: (image.image_extension, paths)}, session)
     
 async def get_movie_image_by_id(
     film_id: UUID, session: AsyncSession = Depends(db_session)
@@ -66,26 +220,42 @@ async def get_movie_image_by_id(
     
     image_path = []
     for img in image:
-        path = f"{IMAGE_PATH}/{str(img.image_id)}.{img.image_extension.split('/')[1]}"
-        image_path.append(path)
+        image_path.append(image_url(img))
 
     return image_path
 
 async def get_cover_image(
     film_id: UUID, session: AsyncSession = Depends(db_session)
 ):
-    statement = select(Image).where(Image.film_id == film_id and Image.is_cover == True)
+    statement = select(Image).where(Image.film_id == film_id, Image.is_cover == True)
     result = await session.exec(statement)
     image = result.first()
 
     if image == None:
         raise FileNotFoundError()
     
-    path = f"{IMAGE_PATH}/{str(image.image_id)}.{image.image_extension.split('/')[1]}"
+    path = image_url(image)
     
     return path
 
+async def get_cover_images(
+    film_ids: list[UUID], session: AsyncSession = Depends(db_session)
+) -> dict[UUID, str]:
+    # one query for a whole page of films instead of one get_cover_image per row;
+    # the thumbnail is used when the derivative pipeline has produced it
+    if not film_ids:
+        return {}
+    statement = (
+        select(Image, ImageVariant)
+        .outerjoin(
+            ImageVariant,
+            (ImageVariant.image_id == Image.image_id) & (ImageVariant.variant == COVER_VARIANT),
+        )
+        .where(Image.film_id.in_(film_ids), Image.is_cover == True)
+    )
+    result = await session.exec(statement)
 
-    
-
-        
\ No newline at end of file
+    covers = {}
+    for image, thumbnail in result.all():
+        covers.setdefault(image.film_id, variant_url(image, thumbnail) if thumbnail else image_url(image))
+    return covers
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+
+from app.api.auth.deps import require_role, token_cache
+from app.api.auth.hash import password_hash_stats
+from app.api.response_code import common_responses
+from app.cache import cache_stats
+from app.db.db import async_engine, replica_engines, pool_stats
+from app.deps.rate_limit import rate_limit_stats
+from app.enums import Role
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get(
+    "",
+    responses={401: {**common_responses[401]}, 403: {**common_responses[403]}, 500: {**common_responses[500]}},
+)
+async def get_metrics(_: str = Depends(require_role(Role.ADMIN))):
+    return {
+        "password_hashing": password_hash_stats(),
+        "caches": {**cache_stats(), "auth_tokens": token_cache.stats()},
+        "rate_limits": rate_limit_stats(),
+        "database": {
+            "primary": pool_stats(async_engine),
+            "replicas": [pool_stats(engine) for engine in replica_engines],
+        },
+    }
@@ -1,12 +1,13 @@
 from uuid import UUID
+from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.exceptions import UniqueConstraintViolation
-from app.db.db import db_session
+from app.db.db import db_session, db_read_session
 from app.api.response_code import common_responses
-from app.deps.pagination import pagination_params
+from app.deps.pagination import pagination_params, CursorPage
 from app.api.user_films.schemas import UserFilmResponse
 from app.db.models import Reaction, ReactionType, Review
 from .service import (
@@ -17,8 +18,7 @@ from .service import (
 )
 from .schemas import ReviewCreate, ReviewCreateResponse, ReviewUpdate, ReviewResponse
 
-from app.api.users.service import get_user_by_id
-from app.api.auth.deps import get_current_user
+from app.api.auth.deps import Principal, get_current_user, get_principal
 
 router = APIRouter(prefix="/reviews", tags=["Reviews"])
 
@@ -83,14 +83,11 @@ async def write_review(
 async def delete_review(
     review_id: UUID,
     session: AsyncSession = Depends(db_session),
-    sub = Depends(get_current_user),
+    principal: Principal = Depends(get_principal),
 ):
-    user_id = sub["user_id"]
-    user = await get_user_by_id(user_id, session)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    # ownership is checked against the token's user id, no user row is needed
     try:
-        deleted_review = await delete_review_by_review_id(user_id, review_id, session)
+        deleted_review = await delete_review_by_review_id(principal.user_id, review_id, session)
     except PermissionError:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not authorized to delete this review")
     except ValueError as e:
@@ -99,7 +96,7 @@ async def delete_review(
 
 @router.get(
     "/film/{film_id}",
-    response_model=list[ReviewResponse] | None,
+    response_model=list[ReviewResponse] | CursorPage[ReviewResponse] | None,
     status_code=status.HTTP_200_OK,
     responses={404: {**common_responses[404],
     "content": {
@@ -111,11 +108,12 @@ async def delete_review(
 )
 async def get_movie_reviews(
     film_id: UUID,
+    sort: Literal["newest", "most_liked", "helpful"] = "newest",
     pagination: dict = Depends(pagination_params),
-    session: AsyncSession = Depends(db_session),
+    session: AsyncSession = Depends(db_read_session),
 ):
     try:
-        reviews = await get_review_by_film_id(film_id, pagination, session)
+        reviews = await get_review_by_film_id(film_id, pagination, sort, session)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     return reviews
@@ -123,7 +121,7 @@ async def get_movie_reviews(
 
 @router.get(
     "/user/{username}",
-    response_model=list[ReviewResponse] | None,
+    response_model=list[ReviewResponse] | CursorPage[ReviewResponse] | None,
     status_code=status.HTTP_200_OK,
     responses={404: {**common_responses[404],
                 "content": {
@@ -136,7 +134,7 @@ async def get_movie_reviews(
 async def get_user_reviews(
     username: str,
     pagination: dict = Depends(pagination_params),
-    session: AsyncSession = Depends(db_session),
+    session: AsyncSession = Depends(db_read_session),
 ):
     try:
         reviews = await get_review_by_username(username, pagination, session)
@@ -197,7 +195,7 @@ async def update_review(
 )
 async def get_review(
     film_id: UUID,
-    session: AsyncSession = Depends(db_session),
+    session: AsyncSession = Depends(db_read_session),
 ) -> ReviewCreate:
     review = await get_review_by_review_id(film_id, session)
     if not review:
@@ -233,7 +231,6 @@ async def react_a_review(
     session: AsyncSession = Depends(db_session),
     sub  = Depends(get_current_user),
 ) -> Reaction:
-    print(reaction_type)
     user_id = sub["user_id"]
     try:
         new_reaction = await react_to_review(user_id, review_id, reaction_type, session)
@@ -1,35 +1,81 @@
 from uuid import UUID
+from typing import Literal
 
 from fastapi import Depends
-from sqlmodel import select, join
+from sqlmodel import select, join, update, delete, func, or_, case, cast
+from sqlalchemy import Float
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import expression
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db.db import db_session
+from app.cache import film_detail_cache
+from app.deps.pagination import CursorPage, check_cursor_sort, paginate, page_rows, build_page
 from app.exceptions import UniqueConstraintViolation
-from app.db.models import Review, UserFilm, Film, Reaction, User
+from app.db.models import Review, UserFilm, Film, FilmReviewStats, Reaction, User
 from app.enums import UserFilmStatus, ReactionType
 
 from .schemas import ReviewCreate, ReviewCreateResponse, ReviewUpdate, ReviewResponse
 
+async def _add_to_film_rating(film_id: UUID, rating_delta: int, count_delta: int, session: AsyncSession):
+    # integer sum + count updated in SQL; the average is computed when read
+    statement = (
+        update(Film)
+        .where(Film.id == film_id)
+        .values(
+            rating_sum=Film.rating_sum + rating_delta,
+            rating_count=Film.rating_count + count_delta,
+        )
+    )
+    await session.exec(statement)
+
+# z for a 95% confidence interval
+WILSON_Z = 1.96
+
+def review_helpfulness(like_count, dislike_count):
+    # Wilson score lower bound of the share of likes, as a SQL expression so it
+    # is computed from the same counts the UPDATE writes; 0 without reactions
+    z2 = WILSON_Z * WILSON_Z
+    n = cast(like_count + dislike_count, Float)
+    p = cast(like_count, Float) / n
+    bound = (p + z2 / (2 * n) - WILSON_Z * func.sqrt((p * (1 - p) + z2 / (4 * n)) / n)) / (1 + z2 / n)
+    return case((like_count + dislike_count > 0, bound), else_=0.0)
+
+REVIEW_SORT_KEYS = {
+    "newest": Review.created_at,
+    "most_liked": Review.like_count,
+    "helpful": Review.score,
+}
+
+REVIEW_STATS_COLUMNS = [
+    "review_count", *(f"rating_{rating}" for rating in range(1, 11)), "like_total", "dislike_total",
+]
+
+async def _add_to_review_stats(film_id: UUID, deltas: dict[str, int], session: AsyncSession):
+    # upsert, so a film gets its stats row with its first review
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    statement = insert(FilmReviewStats).values(film_id=film_id, **deltas)
+    statement = statement.on_conflict_do_update(
+        index_elements=["film_id"],
+        set_={column: getattr(FilmReviewStats, column) + delta for column, delta in deltas.items()},
+    )
+    await session.exec(statement)
+
 async def create_review(
     user_id: UUID,
     film_id: UUID,
     request: ReviewCreate,
     session: AsyncSession = Depends(db_session),
 ) -> ReviewCreateResponse:
-    statement = (
-        select(UserFilm, Film)
-        .join(Film, Film.id == UserFilm.film_id)
-        .where(
-            UserFilm.user_id == user_id,
-            UserFilm.film_id == film_id
-        )
+    statement = select(UserFilm).where(
+        UserFilm.user_id == user_id,
+        UserFilm.film_id == film_id
     )
     result = await session.exec(statement)
-    temp = result.first()
-    user_film = temp[0] if temp else None
-    film = temp[1] if temp else None
+    user_film = result.first()
     
     if user_film is None:
         raise ValueError("You haven't added this film yet")
@@ -43,12 +89,10 @@ async def create_review(
         comment=request.comment,
     )
     session.add(review)
-    
-    new_rating = ((film.rating * film.rating_count) + request.rating) / (film.rating_count + 1)
-    film.rating = new_rating
-    film.rating_count += 1
-    session.add(film)
+    await _add_to_film_rating(film_id, request.rating, 1, session)
+    await _add_to_review_stats(film_id, {"review_count": 1, f"rating_{request.rating}": 1}, session)
     await session.commit()
+    await film_detail_cache.delete(str(film_id))
     review = ReviewCreateResponse(
         id=review.id,
         film_id=film_id,
@@ -67,8 +111,11 @@ async def get_review_by_review_id(
     return result.first()
 
 async def get_review_by_film_id(
-    film_id: UUID, pagination: dict, session: AsyncSession = Depends(db_session)
-) -> list[Review] | None:
+    film_id: UUID, pagination: dict,
+    sort: Literal["newest", "most_liked", "helpful"] = "newest",
+    session: AsyncSession = Depends(db_session),
+) -> list[ReviewResponse] | CursorPage[ReviewResponse] | None:
+    check_cursor_sort(pagination, sort)
     statement1 = select(Film).where(Film.id == film_id)
     result1 = await session.exec(statement1)
     film = result1.first()
@@ -76,10 +123,13 @@ async def get_review_by_film_id(
     if film is None:
         raise ValueError("Film not found")
     
-    statement = select(Review,User.username).where(Review.film_id == film_id).join(
-        User, Review.user_id == User.id).offset(pagination["offset"]).limit(pagination["limit"])
+    # each sort seeks on a (film_id, key, id) index
+    sort_key = REVIEW_SORT_KEYS[sort]
+    statement = select(Review,User.username,sort_key).where(Review.film_id == film_id).join(
+        User, Review.user_id == User.id)
+    statement = paginate(statement, pagination, sort_key, Review.id)
     result = await session.exec(statement)
-    reviews = result.all()
+    reviews, next_cursor = page_rows(result.all(), pagination, lambda row: (row[2], row[0].id), sort)
 
     if not reviews:
         raise ValueError("No reviews found for this film")
@@ -99,12 +149,11 @@ async def get_review_by_film_id(
         )
         review_responses.append(review_response)
 
-
-    return review_responses
+    return build_page(review_responses, pagination, next_cursor)
 
 async def get_review_by_username(
     username: str, pagination: dict, session: AsyncSession = Depends(db_session)
-) -> list[ReviewResponse] | None:
+) -> list[ReviewResponse] | CursorPage[ReviewResponse] | None:
     statement = select(User.id).where(User.username == username)
     result = await session.exec(statement)
     user = result.first()
@@ -113,9 +162,10 @@ async def get_review_by_username(
         raise ValueError("User not found")
 
     statement2 = select(Review,Film.title).where(Review.user_id == user).join(Film, Film.id == 
-                Review.film_id).offset(pagination["offset"]).limit(pagination["limit"])
+                Review.film_id)
+    statement2 = paginate(statement2, pagination, Review.created_at, Review.id)
     result2 = await session.exec(statement2)
-    reviews = result2.all()
+    reviews, next_cursor = page_rows(result2.all(), pagination, lambda row: (row[0].created_at, row[0].id))
 
     if not reviews:
         raise ValueError("No reviews found for this user")
@@ -135,8 +185,22 @@ async def get_review_by_username(
         )
         review_responses.append(review_response)
 
+    return build_page(review_responses, pagination, next_cursor)
 
-    return review_responses
+def _reaction_totals(reaction: ReactionType, sign: int = 1) -> dict:
+    if reaction == ReactionType.LIKE:
+        return {"like_total": sign}
+    return {"dislike_total": sign}
+
+def _reaction_values(totals: dict) -> dict:
+    # new Review counters and the score derived from them, all in one UPDATE
+    like_count = Review.like_count + totals.get("like_total", 0)
+    dislike_count = Review.dislike_count + totals.get("dislike_total", 0)
+    return {
+        "like_count": like_count,
+        "dislike_count": dislike_count,
+        "score": review_helpfulness(like_count, dislike_count),
+    }
 
 async def react_to_review(
     user_id: UUID,
@@ -144,48 +208,56 @@ async def react_to_review(
     reaction: ReactionType,
     session: AsyncSession = Depends(db_session),
 ) -> Reaction:
-    #reaction = ReactionType(reaction)
-    statement = select(Review).where(Review.id == review_id)
+    # Counters are adjusted with server-side increments so concurrent
+    # reactions on the same review never overwrite each other.
+    # Switching reaction flips the row in place; the reaction_type filter makes
+    # a concurrent duplicate switch match nothing instead of counting twice.
+    # Every reaction also bumps the film's FilmReviewStats row, so reactions
+    # to one popular film queue on that row lock (held only until the commit).
+    # The film detail cache is not evicted here: its like/dislike totals may
+    # lag by up to FILM_CACHE_TTL, where evicting on every reaction would make
+    # a busy film miss the cache almost every time.
+    statement = (
+        update(Reaction)
+        .where(
+            Reaction.user_id == user_id,
+            Reaction.review_id == review_id,
+            Reaction.reaction_type != reaction,
+        )
+        .values(reaction_type=reaction)
+        .returning(Reaction)
+    )
     result = await session.exec(statement)
-    review = result.first()
-    
-    if review is None:
-        raise ValueError("Review not found")
-    
-    statement2 = select(Reaction).where(Reaction.user_id == user_id, Reaction.review_id == review_id)
-    result2 = await session.exec(statement2)
-    existing_reaction = result2.first()
-    if existing_reaction: 
-        if existing_reaction.reaction_type == reaction:
+    react = result.scalars().first()
+
+    if react is not None:
+        previous = ReactionType.DISLIKE if reaction == ReactionType.LIKE else ReactionType.LIKE
+        totals = {**_reaction_totals(reaction), **_reaction_totals(previous, -1)}
+    else:
+        statement2 = (
+            insert(Reaction)
+            .values(user_id=user_id, review_id=review_id, reaction_type=reaction)
+            .on_conflict_do_nothing(index_elements=["user_id", "review_id"])
+            .returning(Reaction)
+        )
+        try:
+            result2 = await session.exec(statement2)
+        except IntegrityError:
+            await session.rollback()
+            raise ValueError("Review not found")
+        react = result2.scalars().first()
+        if react is None:
+            await session.rollback()
             raise UniqueConstraintViolation("You have already reacted the same reaction to this review, use delete method to remove your reaction")
-        # if the reaction is different, update the like/dislike count
-        if existing_reaction.reaction_type == ReactionType.LIKE:
-            review.like_count -= 1
-            review.dislike_count += 1
-        elif existing_reaction.reaction_type == ReactionType.DISLIKE:
-            review.dislike_count -= 1
-            review.like_count += 1
-        existing_reaction.reaction_type = reaction
-        session.add(existing_reaction)
-        session.add(review)
-        await session.commit()
-        await session.refresh(existing_reaction)
-        await session.refresh(review)
-        return existing_reaction
-    if reaction == ReactionType.LIKE:
-        review.like_count += 1
-    elif reaction == ReactionType.DISLIKE:
-        review.dislike_count += 1
-    react = Reaction(
-        user_id=user_id,
-        review_id=review_id,
-        reaction_type=reaction,
+        totals = _reaction_totals(reaction)
+
+    result = await session.exec(
+        update(Review).where(Review.id == review_id).values(**_reaction_values(totals)).returning(Review.film_id)
     )
-    session.add(review)
-    session.add(react)
+    film_id = result.scalar()
+    if film_id is not None:
+        await _add_to_review_stats(film_id, totals, session)
     await session.commit()
-    await session.refresh(review)
-    await session.refresh(react)
     
     return react
 async def unreact_to_review(
@@ -193,29 +265,29 @@ async def unreact_to_review(
     review_id: UUID,
     session: AsyncSession = Depends(db_session),
 ) -> Review :
-    statement = select(Review).where(Review.id == review_id)
+    statement = (
+        delete(Reaction)
+        .where(Reaction.user_id == user_id, Reaction.review_id == review_id)
+        .returning(Reaction.reaction_type)
+    )
     result = await session.exec(statement)
-    review = result.first()
+    reaction_type = result.scalar()
     
-    if review is None:
-        raise ValueError("Review not found")
-    
-    statement2 = select(Reaction).where(Reaction.user_id == user_id, Reaction.review_id == review_id)
-    result2 = await session.exec(statement2)
-    existing_reaction = result2.first()
-    
-    if existing_reaction is None:
+    if reaction_type is None:
+        await session.rollback()
         raise ValueError("You have not reacted to this review yet")
     
-    if existing_reaction.reaction_type == ReactionType.LIKE:
-        review.like_count -= 1
-    elif existing_reaction.reaction_type == ReactionType.DISLIKE:
-        review.dislike_count -= 1
-    
-    await session.delete(existing_reaction)
-    session.add(review)
+    statement2 = (
+        update(Review)
+        .where(Review.id == review_id)
+        .values(**_reaction_values(_reaction_totals(reaction_type, -1)))
+        .returning(Review)
+    )
+    result2 = await session.exec(statement2)
+    review = result2.scalars().first()
+    if review is not None:
+        await _add_to_review_stats(review.film_id, _reaction_totals(reaction_type, -1), session)
     await session.commit()
-    await session.refresh(review)
     
     return review
 
@@ -224,7 +296,8 @@ async def delete_review_by_review_id(
     review_id: UUID,
     session: AsyncSession = Depends(db_session),
 ):
-    statement = select(Review).where(Review.id == review_id)
+    # lock the review so a concurrent update can't change the rating we subtract
+    statement = select(Review).where(Review.id == review_id).with_for_update()
     result = await session.exec(statement)
     review = result.first()
     
@@ -235,16 +308,20 @@ async def delete_review_by_review_id(
     if str(review.user_id) != str(user_id):
         raise PermissionError("You are not authorized to delete this review")
     
-    statement2 = select(Film).where(Film.id == review.film_id)
-    result2 = await session.exec(statement2)
-    film = result2.first()
-    
-    film.rating = ((film.rating * film.rating_count) - review.rating) / (film.rating_count - 1) if film.rating_count > 1 else 0
-    film.rating_count -= 1
-    session.add(film)
+    await _add_to_film_rating(review.film_id, -review.rating, -1, session)
+    await _add_to_review_stats(
+        review.film_id,
+        {
+            "review_count": -1,
+            f"rating_{review.rating}": -1,
+            "like_total": -review.like_count,
+            "dislike_total": -review.dislike_count,
+        },
+        session,
+    )
     await session.delete(review)
     await session.commit()
-    await session.refresh(film)
+    await film_detail_cache.delete(str(review.film_id))
     
     return {"message": "Review successfully deleted", "review_id": review_id}
 
@@ -254,7 +331,7 @@ async def update_review_by_review_id(
     request: ReviewCreate,
     session: AsyncSession = Depends(db_session),
 ) -> Review | None:
-    statement = select(Review).where(Review.id == review_id)
+    statement = select(Review).where(Review.id == review_id).with_for_update()
     result = await session.exec(statement)
     review = result.first()
     
@@ -264,18 +341,19 @@ async def update_review_by_review_id(
     if str(review.user_id) != str(user_id):
         raise PermissionError("You are not authorized to update this review")
     
-    statement2 = select(Film).where(Film.id == review.film_id)
-    result2 = await session.exec(statement2)
-    film = result2.first()
-    film.rating = ((film.rating * film.rating_count) - review.rating + request.rating) / film.rating_count
+    await _add_to_film_rating(review.film_id, request.rating - review.rating, 0, session)
+    if request.rating != review.rating:
+        await _add_to_review_stats(
+            review.film_id, {f"rating_{review.rating}": -1, f"rating_{request.rating}": 1}, session
+        )
     
     review.rating = request.rating
     review.comment = request.comment
     
     session.add(review)
-    session.add(film)
     
     await session.commit()
+    await film_detail_cache.delete(str(review.film_id))
     
     review = ReviewUpdate(
         id=review.id,
@@ -285,4 +363,39 @@ async def update_review_by_review_id(
         last_updated_at=review.last_updated_at,
     )
     
-    return review
\ No newline at end of file
+    return review
+
+def _review_stats_from_reviews():
+    # the same aggregates computed from scratch, one row per reviewed film
+    return select(
+        Review.film_id,
+        func.count().label("review_count"),
+        *(func.count().filter(Review.rating == rating).label(f"rating_{rating}") for rating in range(1, 11)),
+        func.coalesce(func.sum(Review.like_count), 0).label("like_total"),
+        func.coalesce(func.sum(Review.dislike_count), 0).label("dislike_total"),
+    ).group_by(Review.film_id)
+
+async def rebuild_review_stats(session: AsyncSession = Depends(db_session)) -> int:
+    # replaces every stats row in one transaction; used for backfills and repairs
+    await session.exec(delete(FilmReviewStats))
+    result = await session.exec(
+        insert(FilmReviewStats).from_select(["film_id", *REVIEW_STATS_COLUMNS], _review_stats_from_reviews())
+    )
+    await session.commit()
+    return result.rowcount
+
+async def check_review_stats(session: AsyncSession = Depends(db_session)) -> list[UUID]:
+    # films whose stored stats differ from their reviews, in either direction
+    expected = _review_stats_from_reviews().subquery()
+    statement = (
+        select(func.coalesce(expected.c.film_id, FilmReviewStats.film_id))
+        .select_from(
+            expected.join(FilmReviewStats, FilmReviewStats.film_id == expected.c.film_id, full=True)
+        )
+        .where(or_(*(
+            func.coalesce(expected.c[column], 0) != func.coalesce(getattr(FilmReviewStats, column), 0)
+            for column in REVIEW_STATS_COLUMNS
+        )))
+    )
+    result = await session.exec(statement)
+    return result.all()
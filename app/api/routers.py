@@ -6,6 +6,8 @@ from app.api.users.router import router as user_router
 from app.api.films.router import router as film_router
 from app.api.user_films.router import router as user_film_router
 from app.api.reviews.router import router as review_router
+from app.api.metrics.router import router as metrics_router
+from app.api.images.router import router as image_router
 
 api_router = APIRouter()
 
@@ -14,4 +16,6 @@ api_router.include_router(auth_router)
 api_router.include_router(user_router)
 api_router.include_router(film_router)
 api_router.include_router(user_film_router)
-api_router.include_router(review_router)
\ No newline at end of file
+api_router.include_router(review_router)
+api_router.include_router(metrics_router)
+api_router.include_router(image_router)
\ No newline at end of file
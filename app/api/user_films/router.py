@@ -3,7 +3,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db.db import db_session
+from app.db.db import db_session, db_read_session
 from app.api.response_code import common_responses
 from app.deps.pagination import pagination_params
 from app.api.user_films.schemas import(
@@ -11,8 +11,7 @@ from app.api.user_films.schemas import(
 )
 from .service import create_user_film, update_user_film_by_id, get_a_user_user_film_list
 
-from app.api.users.service import get_user_by_id
-from app.api.auth.deps import get_current_user
+from app.api.auth.deps import Principal, get_current_user, get_principal
 
 router = APIRouter(prefix="/user-films", tags=["User Films"])
 
@@ -20,7 +19,7 @@ router = APIRouter(prefix="/user-films", tags=["User Films"])
             responses={401: {**common_responses[401],}, 500: common_responses[500]})
 async def get_my_film_list(
     pagination: dict = Depends(pagination_params),
-    session: AsyncSession = Depends(db_session),
+    session: AsyncSession = Depends(db_read_session),
     sub = Depends(get_current_user)
 ):  
     user_film_list = await get_a_user_user_film_list(sub["user_id"], pagination, True, session)
@@ -45,7 +44,7 @@ async def get_my_film_list(
 async def get_user_film_list(
     user_id: UUID,
     pagination: dict = Depends(pagination_params),
-    session: AsyncSession = Depends(db_session),
+    session: AsyncSession = Depends(db_read_session),
 ):  
     try:
         user_film_list = await get_a_user_user_film_list(user_id, pagination, False, session)
@@ -82,12 +81,14 @@ async def get_user_film_list(
 async def add_user_film(
     film_id: UUID,
     request: UserAddFilm, session: AsyncSession = Depends(db_session), 
-    user_id = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
     try:
         new_user_film = await create_user_film(
-            user_id["user_id"], film_id, request.status, request.progress, session
+            principal.user_id, film_id, request.status, request.progress, session
         )
+    except PermissionError:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
@@ -121,18 +122,12 @@ async def add_user_film(
 async def update_user_film(
     film_id: UUID,
     request: UserAddFilm, session: AsyncSession = Depends(db_session), 
-    user_id = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
-    user = await get_user_by_id(user_id["user_id"], session)
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User does not exist",
-        )
-        
+    # a user that no longer exists has no UserFilm rows, so the service 400s
     try:
         updated_user_film = await update_user_film_by_id(
-            user_id["user_id"], film_id, request.status, request.progress, session
+            principal.user_id, film_id, request.status, request.progress, session
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -2,6 +2,7 @@ from uuid import UUID
 
 from fastapi import Depends
 from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db.db import db_session
@@ -11,13 +12,7 @@ from .schemas import UserFilmOut
 
 
 async def create_user_film(id: UUID, film_id: UUID, status: str, progress: int, session: AsyncSession = Depends(db_session)):
-    statement = select(User).where(User.id == id)
-    result = await session.exec(statement)
-    user = result.first()
-
-    if user is None: #should not happen because authentication is done before this function
-        raise ValueError(f"User with id {id} does not exist")
-    
+    # the caller is already authenticated, the user row isn't loaded again
     statement2 = select(Film).where(Film.id == film_id)
     result2 = await session.exec(statement2)
     film = result2.first()
@@ -31,7 +26,7 @@ async def create_user_film(id: UUID, film_id: UUID, status: str, progress: int,
     elif progress > film.episode_count:
         raise ValueError(f"Progress cannot be greater than {film.episode_count}")
     
-    statement3 = select(UserFilm).where(UserFilm.film_id == film_id and UserFilm.user_id == id)
+    statement3 = select(UserFilm).where(UserFilm.film_id == film_id, UserFilm.user_id == id)
     result3 = await session.exec(statement3)
     existing_user_film = result3.first()
     if existing_user_film:
@@ -44,7 +39,17 @@ async def create_user_film(id: UUID, film_id: UUID, status: str, progress: int,
         progress=progress,
     )
     session.add(user_film)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        # the token outlived its user, or the film was deleted or added for
+        # this user since the checks above
+        await session.rollback()
+        if await session.get(User, id) is None:
+            raise PermissionError("User no longer exists")
+        if await session.get(Film, film_id) is None:
+            raise ValueError(f"Film with id {film_id} does not exist")
+        raise ValueError(f"UserFilm with film id {film_id} for this user already exists")
     await session.refresh(user_film)
 
     return user_film
@@ -53,7 +58,7 @@ async def update_user_film_by_id(
     id: UUID, film_id : UUID, status: str, progress: int, session: AsyncSession = Depends(db_session)
 ):
 
-    statement = select(UserFilm).where(UserFilm.film_id == film_id and UserFilm.user_id == id)
+    statement = select(UserFilm).where(UserFilm.film_id == film_id, UserFilm.user_id == id)
     result = await session.exec(statement)
     user_film = result.first()
 
@@ -81,19 +86,28 @@ async def update_user_film_by_id(
 async def get_a_user_user_film_list(
     id: UUID, pagination: dict, from_self: bool, session: AsyncSession = Depends(db_session)
 ) -> list[UserFilmOut] | None:
-    statement = select(User).where(User.id == id).offset(pagination["offset"]).limit(pagination["limit"])
+    statement = select(User).where(User.id == id)
     result = await session.exec(statement)
     user = result.first()
     
     if user is None:
         raise ValueError(f"User with id {id} does not exist")
-    elif user.is_private == True and from_self == False:
-        raise PermissionError(f"User with id {id} has private film list")
+    return await list_user_films(user, pagination, from_self, session)
+
+async def list_user_films(
+    user: User, pagination: dict, from_self: bool, session: AsyncSession = Depends(db_session)
+) -> list[UserFilmOut]:
+    # for callers that already hold the User row
+    if user.is_private == True and from_self == False:
+        raise PermissionError(f"User with id {user.id} has private film list")
     
-    statement2 = select(UserFilm,Film).join(Film).where(UserFilm.user_id == user.id and UserFilm.film_id == Film.id)
+    statement2 = (
+        select(UserFilm,Film).join(Film).where(UserFilm.user_id == user.id)
+        .offset(pagination["offset"]).limit(pagination["limit"])
+    )
     result2 = await session.exec(statement2)
     user_film = result2.all()
     user_films : list[UserFilmOut] = []
     for row in user_film:
         user_films.append(UserFilmOut(film_id=row[1].id,film_title=row[1].title,status=row[0].status,progress=row[0].progress))
-    return user_films
\ No newline at end of file
+    return user_films
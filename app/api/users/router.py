@@ -3,7 +3,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db.db import db_session
+from app.db.db import db_session, db_read_session
 from app.api.response_code import common_responses
 from app.deps.pagination import pagination_params
 from app.api.users.schemas import(
@@ -11,16 +11,17 @@ from app.api.users.schemas import(
 )
 from app.api.users.schemas import UserProfile
 from app.api.users.service import(
-    create_user, get_user_by_id, get_user_profile,
+    create_user, build_user_profile, get_user_profile,
     update_user_by_id, change_user_password,
 )
-from app.api.auth.hash import hash_password
-from app.api.auth.deps import get_current_user
+from app.api.auth.hash import hash_password_async
+from app.api.auth.deps import Principal, get_current_user, get_principal, register_ip_limit
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.post("/register", response_model=UserResponse, status_code=201,
+             dependencies=[Depends(register_ip_limit.by_ip)],
              responses={
         400: {**common_responses[400], "content": {
             "application/json": {
@@ -29,13 +30,14 @@ router = APIRouter(prefix="/users", tags=["Users"])
                 }
             }
         }},
+        429: {"description": "Too Many Requests"},
         500: common_responses[500]
     })
 async def register_user(
     request: UserRegister,
     session: AsyncSession = Depends(db_session)
 ):
-    hashed_password = hash_password(request.password)
+    hashed_password = await hash_password_async(request.password)
     try:
         new_user = await create_user(request.username, hashed_password, request.display_name, session)
     except ValueError as e:
@@ -44,9 +46,11 @@ async def register_user(
     
 
 @router.get("/me", response_model=UserProfile, responses={401: {**common_responses[401],},500: common_responses[500]})
-async def get_me(session: AsyncSession = Depends(db_session),pagination: dict = Depends(pagination_params), current_user=Depends(get_current_user)):
-    current_user = await get_user_by_id(UUID(current_user["user_id"]), session)
-    profile = await get_user_profile(current_user.username, pagination, True, session)
+async def get_me(session: AsyncSession = Depends(db_read_session),pagination: dict = Depends(pagination_params), principal: Principal = Depends(get_principal)):
+    current_user = await principal.get_user(session)
+    if current_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    profile = await build_user_profile(current_user, pagination, True, session)
     
     return profile
 
@@ -77,7 +81,7 @@ async def update_my_password(request: UserUpdatePassword, session: AsyncSession
     }},
     500: common_responses[500]
 })
-async def get_user(username: str, pagination: dict = Depends(pagination_params),session: AsyncSession = Depends(db_session)):
+async def get_user(username: str, pagination: dict = Depends(pagination_params),session: AsyncSession = Depends(db_read_session)):
     try:
         user = await get_user_profile(username, pagination, False, session)
     except ValueError as e:
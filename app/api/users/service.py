@@ -1,16 +1,16 @@
 from uuid import UUID
 
 from fastapi import Depends
-from sqlmodel import select
+from sqlmodel import select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db.db import db_session
+from app.db.db import db_session, async_session
 from app.db.models import User
 from .schemas import UserUpdate
 from app.api.users.schemas import UserProfile
-from app.api.user_films.service import get_a_user_user_film_list
+from app.api.user_films.service import list_user_films
 
-from app.api.auth.hash import hash_password
+from app.api.auth.hash import hash_password_async, verify_hash_async
 
 async def create_user(username: str, password_hash: str, display_name: str, session: AsyncSession = Depends(db_session)):
     result = await session.exec(select(User).where(User.username == username))
@@ -32,7 +32,7 @@ async def update_password(id: UUID, new_password: str, session: AsyncSession = D
     result = await session.exec(statement)
     user = result.one()
 
-    new_hash = hash_password(new_password)
+    new_hash = await hash_password_async(new_password)
     user.password_hash = new_hash
     session.add(user)
     await session.commit()
@@ -40,6 +40,19 @@ async def update_password(id: UUID, new_password: str, session: AsyncSession = D
 
     return user
 
+async def rehash_password(id: UUID, old_hash: str, password: str):
+    # Background task after login: upgrades a hash made with older Argon2
+    # parameters. Runs with its own session, and only replaces the hash the
+    # login verified, so a password change in the meantime wins.
+    new_hash = await hash_password_async(password)
+    async with async_session() as session:
+        await session.exec(
+            update(User)
+            .where(User.id == id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        await session.commit()
+
 async def get_user_by_id(id: UUID, session: AsyncSession = Depends(db_session)):
     statement = select(User).where(User.id == id)
     result = await session.exec(statement)
@@ -51,8 +64,10 @@ async def get_user_profile(username: str, pagination: dict, from_self: bool, ses
     user = result.first()
     if user is None:
         raise ValueError(f"User with username {username} does not exist")
-    
-    user_films = await get_a_user_user_film_list(user.id, pagination, from_self, session)
+    return await build_user_profile(user, pagination, from_self, session)
+
+async def build_user_profile(user: User, pagination: dict, from_self: bool, session: AsyncSession = Depends(db_session)):
+    user_films = await list_user_films(user, pagination, from_self, session)
     return UserProfile(
         username=user.username,
         display_name=user.display_name,
@@ -63,13 +78,12 @@ async def get_user_profile(username: str, pagination: dict, from_self: bool, ses
     )
 
 async def change_user_password(id: UUID, old_password: str, new_password: str, session: AsyncSession = Depends(db_session)):
-    hashed_password = hash_password(old_password)
-    statement = select(User).where(User.id == id and User.password_hash == hashed_password)
+    statement = select(User).where(User.id == id)
     result = await session.exec(statement)
     user = result.first()
-    if user is None:
+    if user is None or not await verify_hash_async(user.password_hash, old_password):
         raise ValueError("Old password is incorrect")
-    new_hash = hash_password(new_password)
+    new_hash = await hash_password_async(new_password)
     user.password_hash = new_hash
     session.add(user)
     await session.commit()
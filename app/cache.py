@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from decouple import config
+
+CACHE_URL = config("CACHE_URL", default="")
+FILM_CACHE_SIZE = config("FILM_CACHE_SIZE", default=1024, cast=int)
+FILM_CACHE_TTL = config("FILM_CACHE_TTL", default=300, cast=int)
+
+class LRUCache:
+    # In-process LRU with a per-entry TTL. Not shared between workers. Sync
+    # dependencies use it from the threadpool, so every access takes the lock.
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+class MemoryCache:
+    def __init__(self, name: str, maxsize: int, ttl: float | None = None):
+        self.name = name
+        self._store = LRUCache(maxsize, ttl)
+
+    async def get(self, key: str):
+        return self._store.get(key)
+
+    async def set(self, key: str, value):
+        self._store.set(key, value)
+
+    async def delete(self, key: str):
+        self._store.delete(key)
+
+    async def clear(self):
+        self._store.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._store.stats()}
+
+class RedisCache:
+    # Values must be JSON serializable. Requires the optional `redis` package.
+    def __init__(self, name: str, url: str, ttl: float | None = None):
+        import redis.asyncio as redis
+
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._client = redis.from_url(url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    async def get(self, key: str):
+        raw = await self._client.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value):
+        await self._client.set(self._key(key), json.dumps(value), ex=self.ttl)
+
+    async def delete(self, key: str):
+        await self._client.delete(self._key(key))
+
+    async def clear(self):
+        # only this cache's keys; SCAN, so a big keyspace doesn't block redis
+        keys = [key async for key in self._client.scan_iter(match=self._key("*"))]
+        for start in range(0, len(keys), 500):
+            await self._client.delete(*keys[start:start + 500])
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+caches: dict[str, MemoryCache | RedisCache] = {}
+
+def create_cache(name: str, maxsize: int, ttl: float | None = None) -> MemoryCache | RedisCache:
+    if CACHE_URL:
+        cache = RedisCache(name, CACHE_URL, ttl)
+    else:
+        cache = MemoryCache(name, maxsize, ttl)
+    caches[name] = cache
+    return cache
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in caches.items()}
+
+film_detail_cache = create_cache("film_detail", FILM_CACHE_SIZE, FILM_CACHE_TTL)
@@ -1,17 +1,141 @@
+import hashlib
+import itertools
+import time
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
-from decouple import config
+from decouple import config, Csv
+
+from app.cache import LRUCache
 
 DB_URL = config("DB_URL")
+DB_REPLICA_URLS = config("DB_REPLICA_URLS", default="", cast=Csv())
+DB_ECHO = config("DB_ECHO", default=False, cast=bool)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=float)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+# milliseconds, 0 disables it
+DB_STATEMENT_TIMEOUT = config("DB_STATEMENT_TIMEOUT", default=0, cast=int)
+# round_robin or least_connections
+DB_REPLICA_STRATEGY = config("DB_REPLICA_STRATEGY", default="round_robin")
+# after a write, that client's reads go to the primary for this many seconds
+DB_READ_YOUR_WRITES_SECONDS = config("DB_READ_YOUR_WRITES_SECONDS", default=5, cast=float)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    # Tracks how many checkouts are waiting on a full pool and for how long.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.waiting -= 1
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+def create_engine(url: str) -> AsyncEngine:
+    kwargs = {"echo": DB_ECHO, "future": True}
+    if url.startswith("postgresql"):
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+        if DB_STATEMENT_TIMEOUT:
+            kwargs["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT)}}
+    return create_async_engine(url, **kwargs)
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.sync_engine.pool
+    stats = {"status": pool.status()}
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            waiting=pool.waiting,
+            checkouts=pool.checkouts,
+            wait_seconds_total=pool.wait_seconds_total,
+            wait_seconds_max=pool.wait_seconds_max,
+        )
+    return stats
+
+async_engine = create_engine(DB_URL)
+replica_engines = [create_engine(url) for url in DB_REPLICA_URLS]
 
-async_engine = create_async_engine(DB_URL, echo=True, future=True)
 async_session = sessionmaker(
         bind=async_engine,
         class_=AsyncSession,
         expire_on_commit=False,
 )
+replica_sessions = [
+    sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    for engine in replica_engines
+]
+_round_robin = itertools.count()
+_recent_writers = LRUCache(maxsize=10000, ttl=DB_READ_YOUR_WRITES_SECONDS)
+
 async def db_session() -> AsyncGenerator:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+def _client_key(request: Request) -> str | None:
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+def _checked_out(engine: AsyncEngine) -> int:
+    pool = engine.sync_engine.pool
+    return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+def _pick_replica() -> sessionmaker:
+    if DB_REPLICA_STRATEGY == "least_connections":
+        index = min(range(len(replica_engines)), key=lambda i: _checked_out(replica_engines[i]))
+    else:
+        index = next(_round_robin) % len(replica_sessions)
+    return replica_sessions[index]
+
+def _reads_from_primary(request: Request) -> bool:
+    if request.headers.get("x-read-consistency") == "primary":
+        return True
+    key = _client_key(request)
+    return key is not None and _recent_writers.get(key) is not None
+
+async def db_read_session(request: Request) -> AsyncGenerator:
+    # Read-only work; routed to a replica when any are configured. Not for
+    # routes that fill a shared cache (film detail, genre catalog): the pin below
+    # only covers the client that wrote, while a stale value cached from a
+    # lagging replica would be served to everyone until its TTL.
+    session_factory = async_session
+    if replica_sessions and not _reads_from_primary(request):
+        session_factory = _pick_replica()
+    async with session_factory() as session:
+        yield session
+
+async def track_writes(request: Request, call_next):
+    # Pins a client's reads to the primary for a short window after it writes,
+    # so it does not read stale data from a lagging replica.
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        key = _client_key(request)
+        if key is not None:
+            _recent_writers.set(key, True)
+    return response
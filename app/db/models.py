@@ -1,10 +1,14 @@
 from sqlmodel import Field, SQLModel, Relationship
 from uuid import uuid4, UUID
 from datetime import date,datetime
-from sqlalchemy import Column,TEXT
+from sqlalchemy import Column,TEXT,Float,Index,UniqueConstraint,cast,func,literal_column
 from app.enums import FilmStatus, Role, UserFilmStatus, ReactionType, FilmType
 
 class GenreFilm(SQLModel,table = True):
+    __table_args__ = (
+        Index("ix_genrefilm_genre_id_film_id", "genre_id", "film_id"),
+    )
+
     film_id: UUID = Field(primary_key=True, foreign_key="film.id", ondelete="CASCADE")
     genre_id: int | None = Field(default=None,primary_key=True, foreign_key="genre.id",ondelete="CASCADE")
     
@@ -36,6 +40,12 @@ class User(SQLModel,table = True):
     reactions: list["Reaction"] = Relationship(back_populates="user")
     
 class Film(SQLModel,table = True):
+    __table_args__ = (
+        Index("ix_film_created_at_id", "created_at", "id"),
+        Index("ix_film_film_type_air_status_created_at_id", "film_type", "air_status", "created_at", "id"),
+        Index("ix_film_release_date", "release_date"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     title: str = Field(min_length=1,max_length=255,index=True)
     synopsis: str | None = Field(default=None,sa_column=Column(TEXT, nullable=True))
@@ -43,7 +53,8 @@ class Film(SQLModel,table = True):
     air_status: FilmStatus
     film_type: FilmType
     episode_count: int | None = Field(default=None, nullable=True)
-    rating: float | None = Field(default=None, ge=0, le=10, nullable=True)
+    # the average is derived on read from rating_sum / rating_count
+    rating_sum: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     rating_count: int | None = Field(default=0, nullable=True)
     created_at: datetime = Field(default_factory=datetime.now)
     last_updated_at: datetime = Field(default_factory=datetime.now, sa_column_kwargs={"onupdate": datetime.now})
@@ -52,7 +63,29 @@ class Film(SQLModel,table = True):
     users: list["User"] = Relationship(back_populates="films", link_model=UserFilm)
     images: list["Image"] = Relationship(back_populates="film", cascade_delete=True)
 
+# trigram index so `lower(title) LIKE '%...%'` searches don't scan the table (needs pg_trgm)
+Index(
+    "ix_film_title_trgm",
+    func.lower(Film.title).label("title_lower"),
+    postgresql_using="gin",
+    postgresql_ops={"title_lower": "gin_trgm_ops"},
+)
+
+# sort keys of the films list; the expression indexes below must match them exactly,
+# so the constants are inlined rather than bound as parameters
+film_average_rating = func.coalesce(
+    cast(Film.rating_sum, Float) / func.nullif(Film.rating_count, literal_column("0"), type_=Float),
+    literal_column("-1"),
+)
+film_popularity = func.coalesce(Film.rating_count, literal_column("0"))
+Index("ix_film_average_rating_id", film_average_rating, Film.id)
+Index("ix_film_popularity_id", film_popularity, Film.id)
+
 class Reaction(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("user_id", "review_id", name="uq_reaction_user_id_review_id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id") # reaction from a deleted user won't go away
     review_id: UUID = Field(foreign_key="review.id", ondelete="CASCADE")
@@ -62,6 +95,13 @@ class Reaction(SQLModel, table=True):
     user: "User" = Relationship(back_populates="reactions")
     
 class Review(SQLModel,table = True):
+    __table_args__ = (
+        Index("ix_review_film_id_created_at_id", "film_id", "created_at", "id"),
+        Index("ix_review_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_review_film_id_score_id", "film_id", "score", "id"),
+        Index("ix_review_film_id_like_count_id", "film_id", "like_count", "id"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id", ondelete="CASCADE")
     film_id: UUID = Field(foreign_key="film.id", ondelete="CASCADE")
@@ -69,20 +109,72 @@ class Review(SQLModel,table = True):
     comment: str | None = Field(default=None,sa_column=Column(TEXT, nullable=True))
     like_count: int = Field(default=0,ge=0)
     dislike_count: int = Field(default=0,ge=0)
+    # Wilson lower bound of the like ratio, recomputed whenever the counts change
+    score: float = Field(default=0, sa_column_kwargs={"server_default": "0"})
     created_at: datetime = Field(default_factory=datetime.now)
     last_updated_at: datetime = Field(default_factory=datetime.now, sa_column_kwargs={"onupdate": datetime.now})
     
     #user_films: "UserFilm" = Relationship(back_populates="reviews")
     reactions: list["Reaction"] = Relationship(back_populates="review",cascade_delete=True)
     
+class FilmReviewStats(SQLModel,table = True):
+    # review aggregates per film, kept up to date by the review and reaction write paths
+    film_id: UUID = Field(primary_key=True, foreign_key="film.id", ondelete="CASCADE")
+    review_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_1: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_2: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_3: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_4: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_5: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_6: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_7: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_8: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_9: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_10: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    like_total: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    dislike_total: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+class RevokedToken(SQLModel,table = True):
+    # used refresh tokens by jti; rows can be purged once the token has expired
+    jti: str = Field(primary_key=True, max_length=32)
+    expires_at: datetime = Field(index=True)
+
+class RevokedTokenFamily(SQLModel,table = True):
+    # refresh token families cut off after a used token was replayed; rows can
+    # be purged once every token of the family has expired
+    family: str = Field(primary_key=True, max_length=32)
+    expires_at: datetime = Field(index=True)
+
+class ImageBlob(SQLModel,table = True):
+    # one stored file, shared by every Image row with the same content
+    content_hash: str = Field(primary_key=True, min_length=64, max_length=64)
+    image_extension: str = Field(min_length=1,max_length=255)
+    ref_count: int = Field(default=0, ge=0)
+
 class Image(SQLModel,table = True):
     image_id: UUID = Field(default_factory=uuid4, primary_key=True)
     image_url: str = Field(min_length=1,max_length=255,unique=True,nullable=True)
     image_extension: str = Field(min_length=1,max_length=255)
     film_id: UUID = Field(foreign_key="film.id", ondelete="CASCADE")
     is_cover: bool = Field(default=False)
+    content_hash: str | None = Field(default=None, foreign_key="imageblob.content_hash", index=True, nullable=True)
     
     film: Film = Relationship(back_populates="images")
+    variants: list["ImageVariant"] = Relationship(back_populates="image", cascade_delete=True)
+
+class ImageVariant(SQLModel,table = True):
+    __table_args__ = (
+        UniqueConstraint("image_id", "variant", name="uq_imagevariant_image_id_variant"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    image_id: UUID = Field(foreign_key="image.image_id", ondelete="CASCADE")
+    variant: str = Field(min_length=1,max_length=32)
+    image_extension: str = Field(min_length=1,max_length=255)
+    width: int
+    height: int
+
+    image: Image = Relationship(back_populates="variants")
     
 
     
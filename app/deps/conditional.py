@@ -0,0 +1,9 @@
+from fastapi import Request
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
@@ -1,6 +1,99 @@
-from fastapi import Depends, Query
+import base64
+import json
+from datetime import datetime
+from typing import Generic, TypeVar
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import tuple_
+
+T = TypeVar("T")
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+def encode_cursor(key, id: UUID, sort: str | None = None) -> str:
+    if isinstance(key, datetime):
+        payload = {"k": key.isoformat(), "t": "dt", "id": str(id)}
+    else:
+        payload = {"k": key, "id": str(id)}
+    if sort is not None:
+        payload["s"] = sort
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        key = payload["k"]
+        if payload.get("t") == "dt":
+            key = datetime.fromisoformat(key)
+        sort = payload.get("s")
+        if sort is not None and not isinstance(sort, str):
+            raise ValueError("sort")
+        return {"key": key, "id": UUID(payload["id"]), "sort": sort}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def _check_cursor_key(key, sort_column):
+    # the key is compared with the sort column in SQL, a forged one of another
+    # type would fail there with a 500
+    python_type = sort_column.type.python_type
+    if python_type is float:
+        python_type = (int, float)
+    if isinstance(key, bool) or not isinstance(key, python_type):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def check_cursor_sort(pagination: dict, sort: str):
+    # a cursor taken from a listing with a different sort order; keys of two
+    # sorts can share a type (rating and helpfulness are both floats), so the
+    # cursor names its sort. Cursors without one predate the sorts, i.e. newest.
+    after = pagination.get("after")
+    if after and (after["sort"] or "newest") != sort:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
 def pagination_params(
     offset: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(
+        None,
+        description="Keyset pagination cursor taken from next_cursor. "
+        "Send an empty value to request the first page in cursor mode.",
+    ),
 ):
-    return {"offset": offset, "limit": limit}
\ No newline at end of file
+    return {
+        "offset": offset,
+        "limit": limit,
+        "keyset": cursor is not None,
+        "after": decode_cursor(cursor) if cursor else None,
+    }
+
+def paginate(statement, pagination: dict, sort_column, id_column):
+    # newest first; in keyset mode seek past the last row of the previous page
+    # instead of making the database skip `offset` rows
+    statement = statement.order_by(sort_column.desc(), id_column.desc())
+    if pagination.get("keyset"):
+        after = pagination.get("after")
+        if after:
+            _check_cursor_key(after["key"], sort_column)
+            statement = statement.where(
+                tuple_(sort_column, id_column) < tuple_(after["key"], after["id"])
+            )
+        # one extra row tells us whether there is a next page
+        return statement.limit(pagination["limit"] + 1)
+    return statement.offset(pagination["offset"]).limit(pagination["limit"])
+
+def page_rows(rows: list, pagination: dict, cursor_key, sort: str | None = None) -> tuple[list, str | None]:
+    if not pagination.get("keyset") or len(rows) <= pagination["limit"]:
+        return rows, None
+    rows = rows[:pagination["limit"]]
+    key, id = cursor_key(rows[-1])
+    return rows, encode_cursor(key, id, sort)
+
+def build_page(items: list, pagination: dict, next_cursor: str | None):
+    if pagination.get("keyset"):
+        return CursorPage(items=items, next_cursor=next_cursor)
+    return items
@@ -0,0 +1,104 @@
+import math
+import time
+from collections import Counter, OrderedDict
+
+from fastapi import HTTPException, Request, status
+from decouple import config
+
+# shared store for every worker; empty keeps the buckets in process
+RATE_LIMIT_URL = config("RATE_LIMIT_URL", default="")
+RATE_LIMIT_MAX_KEYS = config("RATE_LIMIT_MAX_KEYS", default=100000, cast=int)
+# number of proxies in front of the app that append to X-Forwarded-For; 0 ignores
+# the header, since clients can forge it otherwise
+RATE_LIMIT_TRUSTED_PROXIES = config("RATE_LIMIT_TRUSTED_PROXIES", default=0, cast=int)
+
+class MemoryBucketStore:
+    # Token buckets in an LRU bounded by RATE_LIMIT_MAX_KEYS; an evicted key starts full.
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict = OrderedDict()
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        # seconds until a token is available, 0 when one was taken
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / refill_per_second
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "keys": len(self._buckets)}
+
+class RedisBucketStore:
+    # Same buckets shared between workers. Requires the optional `redis` package.
+    _SCRIPT = """
+        local capacity = tonumber(ARGV[1])
+        local rate = tonumber(ARGV[2])
+        local now = tonumber(ARGV[3])
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(bucket[1]) or capacity
+        local ts = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+        local wait = 0
+        if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+        redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+        return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._take = self._client.register_script(self._SCRIPT)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        wait = await self._take(keys=[f"rate_limit:{key}"], args=[capacity, refill_per_second, time.time()])
+        return float(wait)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+bucket_store = RedisBucketStore(RATE_LIMIT_URL) if RATE_LIMIT_URL else MemoryBucketStore(RATE_LIMIT_MAX_KEYS)
+_rejections: Counter = Counter()
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUSTED_PROXIES:
+        # each trusted proxy appends the address it saw, so the client is the
+        # entry the outermost one added; anything left of it is client supplied
+        forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    return request.client.host if request.client else "unknown"
+
+class RateLimit:
+    # `attempts` per `per_seconds`, refilled continuously, bursts up to `attempts`
+    def __init__(self, name: str, attempts: int, per_seconds: float):
+        self.name = name
+        self.attempts = attempts
+        self.refill_per_second = attempts / per_seconds
+
+    async def check(self, key: str):
+        wait = await bucket_store.take(f"{self.name}:{key}", self.attempts, self.refill_per_second)
+        if wait > 0:
+            _rejections[self.name] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, try again later",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    async def by_ip(self, request: Request):
+        # usable directly as a dependency
+        await self.check(client_ip(request))
+
+def rate_limit_stats() -> dict:
+    return {**bucket_store.stats(), "rejected": dict(_rejections)}
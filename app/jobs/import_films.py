@@ -0,0 +1,26 @@
+# Bulk load films from an NDJSON or CSV file.
+# Usage: python -m app.jobs.import_films catalog.ndjson [--format csv]
+import argparse
+import asyncio
+
+from app.db.db import async_session
+from app.api.films.importer import IMPORT_FORMATS, import_films, import_format
+
+async def main(path: str, file_format: str | None):
+    file_format = import_format(path, file_format)
+    with open(path, "rb") as stream:
+        async with async_session() as session:
+            report = await import_films(stream, file_format, session)
+    for error in report.errors:
+        print(f"line {error.line}: {error.error}")
+    print(
+        f"Imported {report.imported} films, {report.failed} failed "
+        f"in {report.seconds}s ({report.rows_per_second} rows/s)"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk load films")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.format))
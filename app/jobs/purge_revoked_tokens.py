@@ -0,0 +1,15 @@
+# Delete revoked refresh tokens and token families that have expired since; run
+# it periodically.
+# Usage: python -m app.jobs.purge_revoked_tokens
+import asyncio
+
+from app.db.db import async_session
+from app.api.auth.service import purge_revoked_tokens
+
+async def main():
+    async with async_session() as session:
+        purged = await purge_revoked_tokens(session)
+    print(f"Purged {purged} expired token revocations")
+
+if __name__ == "__main__":
+    asyncio.run(main())
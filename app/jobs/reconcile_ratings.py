@@ -0,0 +1,14 @@
+# Recompute Film.rating_sum / Film.rating_count from the review table.
+# Usage: python -m app.jobs.reconcile_ratings
+import asyncio
+
+from app.db.db import async_session
+from app.api.films.service import reconcile_film_ratings
+
+async def main():
+    async with async_session() as session:
+        updated = await reconcile_film_ratings(session)
+    print(f"Reconciled ratings for {updated} films")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+# Rebuild FilmReviewStats from the review table, or report films whose stats drifted.
+# Usage: python -m app.jobs.review_stats [--check]
+import argparse
+import asyncio
+
+from app.db.db import async_session
+from app.api.reviews.service import check_review_stats, rebuild_review_stats
+
+async def main(check: bool):
+    async with async_session() as session:
+        if check:
+            film_ids = await check_review_stats(session)
+            for film_id in film_ids:
+                print(f"Stats out of date for film {film_id}")
+            print(f"{len(film_ids)} films with inconsistent review stats")
+            return len(film_ids)
+        rebuilt = await rebuild_review_stats(session)
+    print(f"Rebuilt review stats for {rebuilt} films")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or check film review stats")
+    parser.add_argument("--check", action="store_true", help="only report inconsistent films")
+    args = parser.parse_args()
+    raise SystemExit(1 if asyncio.run(main(args.check)) else 0)
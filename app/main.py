@@ -3,9 +3,12 @@ from fastapi.staticfiles import StaticFiles
 from decouple import config
 
 from app.api.routers import api_router
+from app.db.db import track_writes
 
 IMAGE_PATH = config("IMAGE_PATH")
 app = FastAPI()
 
+app.middleware("http")(track_writes)
+
 app.include_router(api_router, prefix="/api")
 app.mount("/static", StaticFiles(directory="static"), name="static")
\ No newline at end of file
@@ -0,0 +1,47 @@
+# Per-request cost of authenticating a bearer token: a full JWT signature check
+# and claims validation against a hit in the verified-token cache, single
+# threaded and from the threadpool the sync dependency runs in. Needs the
+# usual JWT settings in the environment or .env.
+# Usage: python -m benchmarks.auth_overhead [--iterations 20000] [--threads 8]
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from app.api.auth import deps
+from app.api.auth.token import create_access_token
+from app.cache import LRUCache
+from app.enums import Role
+
+def _time(label: str, call, iterations: int, threads: int = 1):
+    started = time.perf_counter()
+    if threads == 1:
+        for _ in range(iterations):
+            call()
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            for _ in pool.map(lambda _: call(), range(iterations)):
+                pass
+    elapsed = time.perf_counter() - started
+    print(f"{label:>28}: {elapsed / iterations * 1e6:8.2f} us/call  {iterations / elapsed:10.0f} calls/s")
+
+def main(iterations: int, threads: int):
+    token = create_access_token(uuid4(), Role.USER)
+
+    def uncached():
+        deps.token_cache.clear()
+        deps.get_current_user(token)
+
+    deps.token_cache = LRUCache(maxsize=deps.TOKEN_CACHE_SIZE)
+    _time("decode, no cache", uncached, iterations)
+    deps.get_current_user(token)
+    _time("cache hit", lambda: deps.get_current_user(token), iterations)
+    _time(f"cache hit, {threads} threads", lambda: deps.get_current_user(token), iterations, threads)
+    print(deps.token_cache.stats())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    main(args.iterations, args.threads)
@@ -0,0 +1,88 @@
+# Requests/sec of GET /api/images/{name}, driven in-process through the ASGI
+# app (no server or network in the loop) for a full download, a Range request
+# and an If-None-Match revalidation. Run from the project root with the usual
+# app settings; a scratch file is written to IMAGE_PATH and removed afterwards.
+# Usage: python -m benchmarks.image_throughput [--size 200000] [--requests 2000] [--concurrency 50]
+import argparse
+import asyncio
+import hashlib
+import os
+import pathlib
+import time
+
+from app.api.images.service import IMAGE_PATH
+from app.main import app
+
+async def _get(path: str, headers: dict[str, str]) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+        "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+    }
+    status = 0
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        # the body once, then a disconnect after the response, like a server would
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif not message.get("more_body", False):
+            finished.set()
+
+    await app(scope, receive, send)
+    return status
+
+async def _run(path: str, headers: dict[str, str], expected: int, requests: int, concurrency: int) -> float:
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            status = await _get(path, headers)
+            if status != expected:
+                raise SystemExit(f"{path} {headers}: expected {expected}, got {status}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+async def main(size: int, requests: int, concurrency: int):
+    content = os.urandom(size)
+    name = f"{hashlib.sha256(content).hexdigest()}.png"
+    file_path = pathlib.Path(IMAGE_PATH, name)
+    file_path.write_bytes(content)
+    path = f"/api/images/{name}"
+    etag = f'"{name.rsplit(".", 1)[0]}"'
+    cases = [
+        ("full body", {}, 200),
+        ("range 0-1023", {"Range": "bytes=0-1023"}, 206),
+        ("if-none-match", {"If-None-Match": etag}, 304),
+    ]
+    try:
+        await _run(path, {}, 200, min(requests, 100), concurrency)  # warm up
+        print(f"{size} byte image, {requests} requests, concurrency {concurrency}")
+        for label, headers, expected in cases:
+            rate = await _run(path, headers, expected, requests, concurrency)
+            print(f"{label:>15}: {rate:10.0f} req/s")
+    finally:
+        file_path.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.size, args.requests, args.concurrency))
@@ -0,0 +1,33 @@
+"""Add keyset pagination indexes
+
+Revision ID: 034fc5686b3c
+Revises: b694d6d830c1
+Create Date: 2026-10-18 11:40:12.381204
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '034fc5686b3c'
+down_revision: Union[str, None] = 'b694d6d830c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_film_created_at_id', 'film', ['created_at', 'id'], unique=False)
+    op.create_index('ix_review_film_id_created_at_id', 'review', ['film_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_review_user_id_created_at_id', 'review', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_review_user_id_created_at_id', table_name='review')
+    op.drop_index('ix_review_film_id_created_at_id', table_name='review')
+    op.drop_index('ix_film_created_at_id', table_name='film')
@@ -0,0 +1,35 @@
+"""Create revoked token table
+
+Revision ID: 1e8b4c6d2a73
+Revises: 6a0f47c2d9e1
+Create Date: 2026-10-18 18:21:47.302918
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e8b4c6d2a73'
+down_revision: Union[str, None] = '6a0f47c2d9e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('revokedtoken',
+    sa.Column('jti', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('jti')
+    )
+    op.create_index(op.f('ix_revokedtoken_expires_at'), 'revokedtoken', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_revokedtoken_expires_at'), table_name='revokedtoken')
+    op.drop_table('revokedtoken')
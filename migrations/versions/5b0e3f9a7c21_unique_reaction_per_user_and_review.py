@@ -0,0 +1,45 @@
+"""Unique reaction per user and review
+
+Revision ID: 5b0e3f9a7c21
+Revises: 034fc5686b3c
+Create Date: 2026-10-18 12:02:47.115930
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e3f9a7c21'
+down_revision: Union[str, None] = '034fc5686b3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keep the oldest reaction when concurrent requests created duplicates
+    op.execute("""
+        DELETE FROM reaction r
+        USING reaction older
+        WHERE r.user_id = older.user_id
+          AND r.review_id = older.review_id
+          AND r.id > older.id
+    """)
+    op.create_unique_constraint('uq_reaction_user_id_review_id', 'reaction', ['user_id', 'review_id'])
+    # counters may have drifted from lost updates, rebuild them from reactions
+    op.execute("""
+        UPDATE review SET
+            like_count = (SELECT count(*) FROM reaction
+                          WHERE reaction.review_id = review.id AND reaction.reaction_type = 'LIKE'),
+            dislike_count = (SELECT count(*) FROM reaction
+                             WHERE reaction.review_id = review.id AND reaction.reaction_type = 'DISLIKE')
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_reaction_user_id_review_id', 'reaction', type_='unique')
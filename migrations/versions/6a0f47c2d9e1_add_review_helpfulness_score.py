@@ -0,0 +1,45 @@
+"""Add review helpfulness score
+
+Revision ID: 6a0f47c2d9e1
+Revises: d5c18e3a7f92
+Create Date: 2026-10-18 16:31:44.209871
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a0f47c2d9e1'
+down_revision: Union[str, None] = 'd5c18e3a7f92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('review', sa.Column('score', sa.Float(), server_default='0', nullable=False))
+    # Wilson score lower bound (z = 1.96), same formula as review_helpfulness()
+    op.execute("""
+        UPDATE review SET score = (
+            p + 3.8416 / (2 * n) - 1.96 * sqrt((p * (1 - p) + 3.8416 / (4 * n)) / n)
+        ) / (1 + 3.8416 / n)
+        FROM (
+            SELECT id, like_count::float / (like_count + dislike_count) AS p,
+                   (like_count + dislike_count)::float AS n
+            FROM review WHERE like_count + dislike_count > 0
+        ) AS counts
+        WHERE review.id = counts.id
+    """)
+    op.create_index('ix_review_film_id_score_id', 'review', ['film_id', 'score', 'id'], unique=False)
+    op.create_index('ix_review_film_id_like_count_id', 'review', ['film_id', 'like_count', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_review_film_id_like_count_id', table_name='review')
+    op.drop_index('ix_review_film_id_score_id', table_name='review')
+    op.drop_column('review', 'score')
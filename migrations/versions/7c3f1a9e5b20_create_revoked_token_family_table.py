@@ -0,0 +1,35 @@
+"""Create revoked token family table
+
+Revision ID: 7c3f1a9e5b20
+Revises: 1e8b4c6d2a73
+Create Date: 2026-10-18 21:07:13.518204
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3f1a9e5b20'
+down_revision: Union[str, None] = '1e8b4c6d2a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('revokedtokenfamily',
+    sa.Column('family', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('family')
+    )
+    op.create_index(op.f('ix_revokedtokenfamily_expires_at'), 'revokedtokenfamily', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_revokedtokenfamily_expires_at'), table_name='revokedtokenfamily')
+    op.drop_table('revokedtokenfamily')
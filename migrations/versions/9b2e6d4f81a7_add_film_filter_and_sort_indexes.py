@@ -0,0 +1,46 @@
+"""Add film filter and sort indexes
+
+Revision ID: 9b2e6d4f81a7
+Revises: f3d86a1b0e57
+Create Date: 2026-10-18 15:07:26.518340
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2e6d4f81a7'
+down_revision: Union[str, None] = 'f3d86a1b0e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_genrefilm_genre_id_film_id', 'genrefilm', ['genre_id', 'film_id'], unique=False)
+    op.create_index(
+        'ix_film_film_type_air_status_created_at_id', 'film',
+        ['film_type', 'air_status', 'created_at', 'id'], unique=False,
+    )
+    op.create_index('ix_film_release_date', 'film', ['release_date'], unique=False)
+    op.create_index(
+        'ix_film_average_rating_id', 'film',
+        [sa.text('coalesce(CAST(rating_sum AS FLOAT) / CAST(nullif(rating_count, 0) AS FLOAT), -1)'), 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_film_popularity_id', 'film', [sa.text('coalesce(rating_count, 0)'), 'id'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_film_popularity_id', table_name='film')
+    op.drop_index('ix_film_average_rating_id', table_name='film')
+    op.drop_index('ix_film_release_date', table_name='film')
+    op.drop_index('ix_film_film_type_air_status_created_at_id', table_name='film')
+    op.drop_index('ix_genrefilm_genre_id_film_id', table_name='genrefilm')
@@ -0,0 +1,39 @@
+"""Store film rating as sum and count
+
+Revision ID: a81d4c2e6f03
+Revises: 5b0e3f9a7c21
+Create Date: 2026-10-18 12:31:05.402117
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a81d4c2e6f03'
+down_revision: Union[str, None] = '5b0e3f9a7c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('film', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE film SET
+            rating_sum = COALESCE((SELECT sum(review.rating) FROM review WHERE review.film_id = film.id), 0),
+            rating_count = (SELECT count(*) FROM review WHERE review.film_id = film.id)
+    """)
+    op.drop_column('film', 'rating')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('film', sa.Column('rating', sa.Float(), nullable=True))
+    op.execute("""
+        UPDATE film SET rating = rating_sum::float / rating_count WHERE rating_count > 0
+    """)
+    op.drop_column('film', 'rating_sum')
@@ -0,0 +1,52 @@
+"""Create image variant table
+
+Revision ID: c7a9e05d3b14
+Revises: e4f27b91c5d8
+Create Date: 2026-10-18 13:41:18.662391
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a9e05d3b14'
+down_revision: Union[str, None] = 'e4f27b91c5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # dropping image.id in 593a5e58537b also dropped the table's primary key
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conrelid = 'image'::regclass AND contype = 'p'
+            ) THEN
+                ALTER TABLE image ADD PRIMARY KEY (image_id);
+            END IF;
+        END $$;
+    """)
+    op.create_table('imagevariant',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('image_id', sa.Uuid(), nullable=False),
+    sa.Column('variant', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.Column('image_extension', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['image_id'], ['image.image_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('image_id', 'variant', name='uq_imagevariant_image_id_variant')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('imagevariant')
+    # the key added by upgrade(); image had none at the previous revision
+    op.execute("ALTER TABLE image DROP CONSTRAINT IF EXISTS image_pkey")
@@ -0,0 +1,44 @@
+"""Create film review stats table
+
+Revision ID: d5c18e3a7f92
+Revises: 9b2e6d4f81a7
+Create Date: 2026-10-18 15:52:09.774615
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5c18e3a7f92'
+down_revision: Union[str, None] = '9b2e6d4f81a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('filmreviewstats',
+    sa.Column('film_id', sa.Uuid(), nullable=False),
+    sa.Column('review_count', sa.Integer(), server_default='0', nullable=False),
+    *(sa.Column(f'rating_{rating}', sa.Integer(), server_default='0', nullable=False) for rating in range(1, 11)),
+    sa.Column('like_total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('dislike_total', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['film_id'], ['film.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('film_id')
+    )
+    ratings = ", ".join(f"rating_{rating}" for rating in range(1, 11))
+    rating_counts = ", ".join(f"count(*) FILTER (WHERE rating = {rating})" for rating in range(1, 11))
+    op.execute(f"""
+        INSERT INTO filmreviewstats (film_id, review_count, {ratings}, like_total, dislike_total)
+        SELECT film_id, count(*), {rating_counts}, COALESCE(sum(like_count), 0), COALESCE(sum(dislike_count), 0)
+        FROM review GROUP BY film_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('filmreviewstats')
@@ -0,0 +1,33 @@
+"""Add trigram index on film title
+
+Revision ID: e4f27b91c5d8
+Revises: a81d4c2e6f03
+Create Date: 2026-10-18 12:58:33.920144
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4f27b91c5d8'
+down_revision: Union[str, None] = 'a81d4c2e6f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_film_title_trgm', 'film', [sa.text('lower(title) gin_trgm_ops')],
+        unique=False, postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_film_title_trgm', table_name='film', postgresql_using='gin')
@@ -0,0 +1,40 @@
+"""Content addressed image storage
+
+Revision ID: f3d86a1b0e57
+Revises: c7a9e05d3b14
+Create Date: 2026-10-18 14:20:51.043876
+
+"""
+import sqlmodel
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3d86a1b0e57'
+down_revision: Union[str, None] = 'c7a9e05d3b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('imageblob',
+    sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('image_extension', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+    op.add_column('image', sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    op.create_index(op.f('ix_image_content_hash'), 'image', ['content_hash'], unique=False)
+    op.create_foreign_key('image_content_hash_fkey', 'image', 'imageblob', ['content_hash'], ['content_hash'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('image_content_hash_fkey', 'image', type_='foreignkey')
+    op.drop_index(op.f('ix_image_content_hash'), table_name='image')
+    op.drop_column('image', 'content_hash')
+    op.drop_table('imageblob')
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# settings the app reads at import time; the suite runs on sqlite
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("JWT_ALG", "HS256")
+os.environ.setdefault("JWT_ACCESS_TOKEN_EXP", "30")
+os.environ.setdefault("JWT_REFRESH_TOKEN_EXP", "7")
+_workdir = tempfile.mkdtemp(prefix="reviewpilem-test-")
+os.environ.setdefault("IMAGE_PATH", os.path.join(_workdir, "static", "images"))
+os.makedirs(os.environ["IMAGE_PATH"], exist_ok=True)
+
+@pytest.fixture
+def session_factory(tmp_path):
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlmodel import SQLModel
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    import app.db.models  # registers the tables with SQLModel.metadata
+    import sqlite_compat
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    event.listen(engine.sync_engine, "connect", sqlite_compat.register)
+
+    async def create_all():
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create_all())
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+@pytest.fixture
+def pg_session_factory():
+    # a disposable PostgreSQL database for what sqlite can't show, such as row
+    # locking under concurrent writers; its tables are dropped and recreated
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
+    from sqlmodel import SQLModel
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    import app.db.models  # registers the tables with SQLModel.metadata
+
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    # every asyncio.run gets a new event loop, so connections are not pooled
+    engine = create_async_engine(url, poolclass=NullPool)
+
+    async def reset(create: bool):
+        async with engine.begin() as connection:
+            await connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await connection.run_sync(SQLModel.metadata.drop_all)
+            if create:
+                await connection.run_sync(SQLModel.metadata.create_all)
+
+    asyncio.run(reset(True))
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(reset(False))
+
+@pytest.fixture
+def queries(session_factory):
+    # SQL statements sent to the database while the test runs
+    from sqlalchemy import event
+
+    engine = session_factory.kw["bind"].sync_engine
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.api.images.derivatives
+    import app.api.users.service
+    import app.db.db
+    import app.deps.rate_limit
+    from app.api.auth.deps import token_cache
+    from app.api.genres.service import _invalidate_genres
+    from app.cache import film_detail_cache
+
+    # app.main mounts ./static
+    monkeypatch.chdir(_workdir)
+    from app.main import app as fastapi_app
+
+    async def override():
+        async with session_factory() as session:
+            yield session
+
+    # background tasks open their own sessions
+    monkeypatch.setattr(app.api.users.service, "async_session", session_factory)
+    monkeypatch.setattr(app.api.images.derivatives, "async_session", session_factory)
+    monkeypatch.setattr(app.deps.rate_limit, "bucket_store", app.deps.rate_limit.MemoryBucketStore(1000))
+    fastapi_app.dependency_overrides[app.db.db.db_session] = override
+    fastapi_app.dependency_overrides[app.db.db.db_read_session] = override
+    for name in os.listdir(os.environ["IMAGE_PATH"]):
+        os.unlink(os.path.join(os.environ["IMAGE_PATH"], name))
+    token_cache.clear()
+    film_detail_cache._store.clear()
+    _invalidate_genres()
+    with TestClient(fastapi_app) as test_client:
+        yield test_client
+    fastapi_app.dependency_overrides.clear()
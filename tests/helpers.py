@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+def register(client, username: str, password: str = "Password123!") -> dict:
+    response = client.post("/api/users/register", json={"username": username, "password": password, "display_name": username})
+    assert response.status_code == 201, response.text
+    response = client.post("/api/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def auth(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+def register_admin(client, session_factory, username: str = "admin", password: str = "Password123!") -> dict:
+    # the role is in the token, so log in again after promoting the user
+    from sqlmodel import update
+
+    from app.db.models import User
+    from app.enums import Role
+
+    register(client, username, password)
+
+    async def promote():
+        async with session_factory() as session:
+            await session.exec(update(User).where(User.username == username).values(role=Role.ADMIN))
+            await session.commit()
+
+    asyncio.run(promote())
+    response = client.post("/api/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def create_film(client, tokens: dict, title: str, images: list[bytes] = (), **fields) -> None:
+    film = {"title": title, "air_status": "airing", "film_type": "Movie", **fields}
+    files = [("images", (f"image{index}.png", content, "image/png")) for index, content in enumerate(images)]
+    return client.post("/api/films", data={"film": json.dumps(film)}, files=files or None, headers=auth(tokens))
+
+def create_genre(client, tokens: dict, name: str) -> dict:
+    response = client.post("/api/genres", json={"genre_name": name}, headers=auth(tokens))
+    assert response.status_code == 201, response.text
+    return response.json()
+
+def import_file(client, tokens: dict, name: str, content: bytes, **params):
+    return client.post("/api/films/import", files={"file": (name, content)}, params=params, headers=auth(tokens))
+
+def import_films(client, tokens: dict, films: list[dict]) -> None:
+    rows = [{"air_status": "airing", "film_type": "Movie", **film} for film in films]
+    response = import_file(client, tokens, "films.ndjson", "\n".join(json.dumps(row) for row in rows).encode())
+    assert response.json()["imported"] == len(rows), response.text
+
+def add_rows(session_factory, *rows) -> None:
+    # straight into the database, for state the API can't set up directly
+    async def run():
+        async with session_factory() as session:
+            session.add_all(rows)
+            await session.commit()
+    asyncio.run(run())
+
+def user_id(session_factory, username: str):
+    from sqlmodel import select
+
+    from app.db.models import User
+
+    async def run():
+        async with session_factory() as session:
+            return (await session.exec(select(User.id).where(User.username == username))).one()
+    return asyncio.run(run())
+
+def film_id(client, title: str):
+    films = client.get("/api/films", params={"limit": 100}).json()
+    return next(film["id"] for film in films if film["title"] == title)
+
+def query(session_factory, statement) -> list:
+    async def run():
+        async with session_factory() as session:
+            return (await session.exec(statement)).all()
+    return asyncio.run(run())
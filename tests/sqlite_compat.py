@@ -0,0 +1,40 @@
+# PostgreSQL features the app relies on, provided for the SQLite test database.
+import re
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import Function
+
+# PostgreSQL JSON functions and their SQLite (JSON1) spelling
+_FUNCTION_NAMES = {"json_agg": "json_group_array", "json_build_object": "json_object"}
+
+def _trigrams(text: str) -> set[str]:
+    # pg_trgm: lower case, words of alphanumerics, each padded with two spaces
+    # in front and one behind
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+def similarity(left: str | None, right: str | None) -> float | None:
+    # pg_trgm's similarity(): shared trigrams over all distinct trigrams
+    if left is None or right is None:
+        return None
+    a, b = _trigrams(left), _trigrams(right)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+@compiles(Function, "sqlite")
+def _compile_function(element, compiler, **kw):
+    name = _FUNCTION_NAMES.get(element.name)
+    if name is None:
+        return compiler.visit_function(element, **kw)
+    return f"{name}{compiler.process(element.clause_expr, **kw)}"
+
+def register(dbapi_connection, connection_record):
+    # engine "connect" listener; sqlite leaves foreign keys unchecked unless asked
+    dbapi_connection.create_function("similarity", 2, similarity, deterministic=True)
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
@@ -0,0 +1,141 @@
+import asyncio
+from uuid import UUID
+
+from sqlmodel import delete, select, update
+
+from app.db.models import User
+from app.enums import Role
+from helpers import add_rows, auth, film_id, import_films, query, register, register_admin, user_id
+
+def refresh(client, refresh_token: str):
+    return client.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+
+def set_user(session_factory, username: str, statement):
+    async def run():
+        async with session_factory() as session:
+            await session.exec(statement.where(User.username == username))
+            await session.commit()
+    asyncio.run(run())
+
+def test_login_issues_both_tokens(client):
+    tokens = register(client, "alice")
+    assert tokens["refresh_token"]
+    assert client.get("/api/users/me", headers=auth(tokens)).status_code == 200
+
+def test_refresh_rotates_and_rejects_replay(client):
+    tokens = register(client, "alice")
+    response = refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    rotated = response.json()
+    assert client.get("/api/users/me", headers=auth(rotated)).status_code == 200
+    assert refresh(client, rotated["refresh_token"]).status_code == 200
+
+def test_replay_revokes_the_token_family(client):
+    tokens = register(client, "alice")
+    rotated = refresh(client, tokens["refresh_token"]).json()
+    # the old token shows up again: it leaked, so the current one is cut off too
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    assert refresh(client, rotated["refresh_token"]).status_code == 401
+    # other logins are separate families
+    other = client.post("/api/auth/login", data={"username": "alice", "password": "Password123!"}).json()
+    assert refresh(client, other["refresh_token"]).status_code == 200
+
+def test_token_without_family_starts_its_own(client, session_factory):
+    from datetime import datetime, timedelta, timezone
+
+    from jose import jwt
+
+    from app.api.auth.token import JWT_ALG, JWT_SECRET, decode_token
+
+    register(client, "alice")
+    legacy = jwt.encode({
+        "sub": str(user_id(session_factory, "alice")), "role": "user", "type": "refresh", "jti": "a" * 32,
+        "exp": datetime.now(timezone.utc) + timedelta(days=1),
+    }, JWT_SECRET, algorithm=JWT_ALG)
+    rotated = refresh(client, legacy).json()
+    assert decode_token(rotated["refresh_token"])["fam"] == "a" * 32
+    assert refresh(client, legacy).status_code == 401
+    assert refresh(client, rotated["refresh_token"]).status_code == 401
+
+def test_purge_drops_expired_revocations(session_factory):
+    from datetime import datetime, timedelta
+
+    from app.api.auth.service import purge_revoked_tokens
+    from app.db.models import RevokedToken, RevokedTokenFamily
+
+    past, future = datetime.utcnow() - timedelta(hours=1), datetime.utcnow() + timedelta(hours=1)
+    add_rows(
+        session_factory,
+        RevokedToken(jti="old", expires_at=past), RevokedToken(jti="new", expires_at=future),
+        RevokedTokenFamily(family="old", expires_at=past), RevokedTokenFamily(family="new", expires_at=future),
+    )
+
+    async def run():
+        async with session_factory() as session:
+            return await purge_revoked_tokens(session)
+
+    assert asyncio.run(run()) == 2
+    assert [row.jti for row in query(session_factory, select(RevokedToken))] == ["new"]
+    assert [row.family for row in query(session_factory, select(RevokedTokenFamily))] == ["new"]
+
+def test_token_types_are_not_interchangeable(client):
+    tokens = register(client, "alice")
+    assert refresh(client, tokens["access_token"]).status_code == 401
+    response = client.get("/api/users/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 401
+
+def test_refresh_rejects_deleted_user(client, session_factory):
+    tokens = register(client, "alice")
+    set_user(session_factory, "alice", delete(User))
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+
+def test_refresh_uses_current_role(client, session_factory):
+    from app.api.auth.token import decode_token
+
+    tokens = register(client, "alice")
+    set_user(session_factory, "alice", update(User).values(role=Role.ADMIN))
+    response = refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    claims = decode_token(response.json()["access_token"])
+    assert claims["role"] == Role.ADMIN
+    UUID(claims["sub"])
+
+def test_token_is_decoded_once_per_request(monkeypatch):
+    from fastapi import Depends, FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api.auth import deps
+    from app.api.auth.token import create_access_token
+    from app.cache import LRUCache
+
+    calls = []
+    monkeypatch.setattr(deps, "token_cache", LRUCache(maxsize=10))
+    monkeypatch.setattr(deps.token_cache, "get", lambda token: calls.append(token))
+
+    app = FastAPI()
+
+    @app.get("/both", dependencies=[Depends(deps.require_role(Role.USER))])
+    def both(
+        principal: deps.Principal = Depends(deps.get_principal),
+        _: dict = Depends(deps.require_role(Role.USER)),
+    ):
+        return {"user_id": str(principal.user_id)}
+
+    token = create_access_token(UUID(int=1), Role.USER)
+    with TestClient(app) as test_client:
+        response = test_client.get("/both", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert len(calls) == 1
+        test_client.get("/both", headers={"Authorization": f"Bearer {token}"})
+        assert len(calls) == 2
+
+def test_deleted_user_cannot_add_films(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": "Film", "episode_count": 1}])
+    tokens = register(client, "alice")
+    set_user(session_factory, "alice", delete(User))
+    # the access token is still valid, the foreign key is what fails
+    response = client.post(
+        f"/api/user-films/{film_id(client, 'Film')}", json={"status": "watching", "progress": 1}, headers=auth(tokens),
+    )
+    assert response.status_code == 401
@@ -0,0 +1,109 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import cache
+from app.cache import LRUCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+def run_threads(target, count=16):
+    errors = []
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+def test_entry_expires(clock):
+    lru = LRUCache(maxsize=10, ttl=5)
+    lru.set("a", 1)
+    clock.now += 4
+    assert lru.get("a") == 1
+    clock.now += 1
+    assert lru.get("a") is None
+    assert lru.stats()["size"] == 0
+
+def test_per_entry_ttl_overrides_default(clock):
+    lru = LRUCache(maxsize=10, ttl=5)
+    lru.set("a", 1, ttl=60)
+    clock.now += 30
+    assert lru.get("a") == 1
+
+def test_least_recently_used_is_evicted():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+
+def test_concurrent_reads_of_expired_entry(clock):
+    lru = LRUCache(maxsize=10, ttl=5)
+    lru.set("token", {"user_id": "u"})
+    clock.now += 10
+    results = []
+    errors = run_threads(lambda: results.append(lru.get("token")))
+    assert errors == []
+    assert results == [None] * 16
+
+def test_concurrent_reads_during_eviction():
+    lru = LRUCache(maxsize=8)
+
+    def churn():
+        for i in range(2000):
+            lru.set(i % 32, i)
+            lru.get((i + 7) % 32)
+
+    assert run_threads(churn) == []
+    assert lru.stats()["size"] <= 8
+
+def test_expired_cached_token_is_rejected(monkeypatch):
+    from app.api.auth import deps
+    from app.api.auth.token import create_token
+
+    monkeypatch.setattr(deps, "token_cache", LRUCache(maxsize=10))
+    token = create_token("00000000-0000-0000-0000-000000000001", "user", timedelta(seconds=-1))
+    deps.token_cache.set(token, {"user_id": "x", "role": "user"}, ttl=-1)
+    with pytest.raises(HTTPException) as e:
+        deps.get_current_user(token)
+    assert e.value.status_code == 401
+
+def test_token_entry_expires_with_the_token(monkeypatch, clock):
+    from app.api.auth import deps
+    from app.api.auth.token import create_token
+
+    monkeypatch.setattr(deps, "token_cache", LRUCache(maxsize=10))
+    token = create_token("00000000-0000-0000-0000-000000000001", "user", timedelta(minutes=10))
+    assert deps.get_current_user(token)["role"] == "user"
+    clock.now += 9 * 60
+    assert deps.token_cache.get(token) is not None
+    # the cache TTL is the token's remaining lifetime, not a fixed period
+    clock.now += 61
+    assert deps.token_cache.get(token) is None
+    assert deps.token_cache.stats()["size"] == 0
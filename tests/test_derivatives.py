@@ -0,0 +1,33 @@
+import io
+import logging
+
+import pytest
+from sqlmodel import select
+
+from app.api.images import derivatives
+from app.db.models import Image, ImageVariant
+from helpers import create_film, query, register_admin
+
+pytestmark = pytest.mark.skipif(derivatives.PILImage is None, reason="Pillow is not installed")
+
+def png(size=(40, 60)) -> bytes:
+    buffer = io.BytesIO()
+    derivatives.PILImage.new("RGB", size, "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_executor_does_not_fork():
+    assert derivatives._get_executor()._mp_context.get_start_method() == "spawn"
+
+def test_failed_variants_are_logged(client, session_factory, caplog):
+    admin = register_admin(client, session_factory)
+    broken = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+    with caplog.at_level(logging.ERROR, logger=derivatives.__name__):
+        assert create_film(client, admin, "Film", [png(), broken]).status_code == 201
+
+    images = {image.image_id: image for image in query(session_factory, select(Image))}
+    variants = query(session_factory, select(ImageVariant))
+    good = {variant.image_id for variant in variants}
+    assert len(good) == 1
+    assert {variant.variant for variant in variants} >= {"thumb", "webp"}
+    failed, = [image_id for image_id in images if image_id not in good]
+    assert f"Generating variants failed for image {failed}" in caplog.text
@@ -0,0 +1,98 @@
+from helpers import create_film, create_genre, film_id, import_films, register_admin
+
+def walk(client, **params) -> list[str]:
+    titles = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get("/api/films", params={**params, "limit": 2, "cursor": cursor})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        titles += [film["title"] for film in page["items"]]
+        cursor = page["next_cursor"]
+    return titles
+
+def test_keyset_walk_matches_offset_order(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": f"Film {index}"} for index in range(5)])
+    for sort in ("newest", "rating", "popularity"):
+        offset_titles = [film["title"] for film in client.get("/api/films", params={"sort": sort, "limit": 100}).json()]
+        assert walk(client, sort=sort) == offset_titles
+
+def test_cursor_of_another_sort_is_rejected(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": f"Film {index}"} for index in range(3)])
+    cursor = client.get("/api/films", params={"sort": "popularity", "limit": 1, "cursor": ""}).json()["next_cursor"]
+    # an int popularity key would pass as a rating, only the sort name tells them apart
+    assert client.get("/api/films", params={"sort": "rating", "cursor": cursor}).status_code == 400
+    assert client.get("/api/films", params={"sort": "popularity", "cursor": cursor}).status_code == 200
+
+def test_film_detail_is_one_query(client, session_factory, queries):
+    admin = register_admin(client, session_factory)
+    create_genre(client, admin, "Drama")
+    create_genre(client, admin, "Comedy")
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+    assert create_film(client, admin, "Film", [png, png + b"\x01"], genres=["Drama", "Comedy"]).status_code == 201
+    film = film_id(client, "Film")
+
+    queries.clear()
+    response = client.get(f"/api/films/{film}")
+    assert response.status_code == 200, response.text
+    detail = response.json()
+    assert sorted(detail["genres"]) == ["Comedy", "Drama"]
+    assert len(detail["images"]) == 2
+    assert all(image.startswith("/api/images/") and image.endswith(".png") for image in detail["images"])
+    assert detail["review_stats"]["review_count"] == 0
+    assert len(queries) == 1
+
+    # served from the detail cache
+    queries.clear()
+    assert client.get(f"/api/films/{film}").json() == detail
+    assert queries == []
+
+def test_film_detail_without_genres_or_images(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": "Bare"}])
+    detail = client.get(f"/api/films/{film_id(client, 'Bare')}").json()
+    assert detail["genres"] == []
+    assert detail["images"] == []
+
+def test_list_queries_do_not_grow_with_the_page(client, session_factory, queries):
+    admin = register_admin(client, session_factory)
+
+    def add_films(count: int):
+        start = len(client.get("/api/films", params={"limit": 100}).json())
+        for index in range(start, start + count):
+            png = b"\x89PNG\r\n\x1a\n" + index.to_bytes(4, "big")
+            assert create_film(client, admin, f"Film {index}", [png]).status_code == 201
+
+    def count_queries(url: str, **params) -> int:
+        queries.clear()
+        response = client.get(url, params={"limit": 100, **params})
+        assert response.status_code == 200, response.text
+        films = response.json()
+        films = films["items"] if isinstance(films, dict) else films
+        assert films and all(film["cover_image"] for film in films)
+        return len(queries)
+
+    add_films(2)
+    small = {url: count_queries(url, **params) for url, params in (("/api/films", {}), ("/api/films/search", {"title": "Film"}))}
+    add_films(6)
+    for url, params in (("/api/films", {}), ("/api/films/search", {"title": "Film"})):
+        # one query for the page and one batched query for every cover on it
+        assert count_queries(url, **params) == small[url] == 2
+        assert count_queries(url, cursor="", **params) == 2
+
+def test_film_detail_is_not_read_from_a_replica(client, session_factory):
+    from app.db.db import db_read_session
+
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": "Film"}])
+    film = film_id(client, "Film")
+
+    # a miss fills the shared cache, a lagging replica's answer would stick
+    async def replica():
+        raise AssertionError("film detail read from a replica")
+        yield
+
+    client.app.dependency_overrides[db_read_session] = replica
+    assert client.get(f"/api/films/{film}").status_code == 200
@@ -0,0 +1,42 @@
+from app.db.db import db_read_session
+from helpers import auth, create_film, create_genre, film_id, register_admin
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+def test_catalog_is_rebuilt_after_a_write(client, session_factory):
+    admin = register_admin(client, session_factory)
+    create_genre(client, admin, "Drama")
+    response = client.get("/api/genres")
+    etag = response.headers["ETag"]
+    assert [genre["genre_name"] for genre in response.json()] == ["Drama"]
+    assert client.get("/api/genres", headers={"If-None-Match": etag}).status_code == 304
+
+    create_genre(client, admin, "Comedy")
+    response = client.get("/api/genres", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [genre["genre_name"] for genre in response.json()] == ["Drama", "Comedy"]
+
+    genre_id = response.json()[0]["id"]
+    renamed = client.patch(f"/api/genres/{genre_id}", json={"genre_name": "Thriller"}, headers=auth(admin))
+    assert renamed.status_code == 200, renamed.text
+    assert [genre["genre_name"] for genre in client.get("/api/genres").json()] == ["Thriller", "Comedy"]
+
+def test_catalog_is_not_read_from_a_replica(client, session_factory):
+    # a replica may still have the list from before the last write
+    async def replica():
+        raise AssertionError("genre catalog read from a replica")
+        yield
+
+    client.app.dependency_overrides[db_read_session] = replica
+    assert client.get("/api/genres").status_code == 200
+
+def test_rename_reaches_cached_film_details(client, session_factory):
+    admin = register_admin(client, session_factory)
+    genre = create_genre(client, admin, "Drama")
+    assert create_film(client, admin, "Film", [PNG], genres=["Drama"]).status_code == 201
+    url = f"/api/films/{film_id(client, 'Film')}"
+    assert client.get(url).json()["genres"] == ["Drama"]
+
+    client.patch(f"/api/genres/{genre['id']}", json={"genre_name": "Thriller"}, headers=auth(admin))
+    assert client.get(url).json()["genres"] == ["Thriller"]
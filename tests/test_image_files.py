@@ -0,0 +1,64 @@
+import hashlib
+import os
+import pathlib
+from uuid import uuid4
+
+import pytest
+
+from app.api.images.service import IMAGE_PATH
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+def write(name: str, content: bytes = PNG) -> str:
+    pathlib.Path(IMAGE_PATH, name).write_bytes(content)
+    return name
+
+def test_content_addressed_image_is_immutable(client):
+    name = write(f"{hashlib.sha256(PNG).hexdigest()}.png")
+    response = client.get(f"/api/images/{name}")
+    assert response.status_code == 200
+    assert response.content == PNG
+    assert "immutable" in response.headers["Cache-Control"]
+    etag = response.headers["ETag"]
+    assert client.get(f"/api/images/{name}", headers={"If-None-Match": etag}).status_code == 304
+
+def test_legacy_image_is_revalidated(client):
+    name = write(f"{uuid4()}.jpeg")
+    response = client.get(f"/api/images/{name}")
+    assert response.status_code == 200
+    assert "immutable" not in response.headers["Cache-Control"]
+
+@pytest.mark.parametrize("name", [
+    f"{uuid4()}.part",
+    f"{hashlib.sha256(PNG).hexdigest()}.png.part",
+    f"{uuid4()}.txt",
+])
+def test_other_files_are_not_served(client, name):
+    write(name)
+    assert client.get(f"/api/images/{name}").status_code == 404
+    os.unlink(pathlib.Path(IMAGE_PATH, name))
+
+def test_range_request_returns_partial_content(client):
+    content = bytes(range(256)) * 4
+    name = write(f"{hashlib.sha256(content).hexdigest()}.png", content)
+    response = client.get(f"/api/images/{name}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(content)}"
+    etag = response.headers["ETag"]
+
+    # If-Range with the current ETag keeps the range, a stale one gets the whole file
+    response = client.get(f"/api/images/{name}", headers={"Range": "bytes=-4", "If-Range": etag})
+    assert (response.status_code, response.content) == (206, content[-4:])
+    response = client.get(f"/api/images/{name}", headers={"Range": "bytes=0-3", "If-Range": '"stale"'})
+    assert (response.status_code, response.content) == (200, content)
+
+    # a matching If-None-Match wins over Range
+    response = client.get(f"/api/images/{name}", headers={"Range": "bytes=0-3", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_unsatisfiable_range(client):
+    name = write(f"{hashlib.sha256(PNG).hexdigest()}.png")
+    response = client.get(f"/api/images/{name}", headers={"Range": f"bytes={len(PNG) + 10}-"})
+    assert response.status_code == 416
@@ -0,0 +1,111 @@
+import asyncio
+import os
+
+import pytest
+from sqlmodel import select
+
+from app.api.images.service import IMAGE_PATH, delete_image, image_file_path
+from app.db.models import Film, Image, ImageBlob
+from helpers import create_film, query, register_admin
+
+PNG = b"\x89PNG\r\n\x1a\n" + os.urandom(64)
+
+def delete(session_factory, image_id):
+    async def run():
+        async with session_factory() as session:
+            await delete_image(image_id, session)
+    asyncio.run(run())
+
+def temp_files():
+    return [name for name in os.listdir(IMAGE_PATH) if name.endswith(".part")]
+
+def test_same_content_is_stored_once(client, session_factory):
+    admin = register_admin(client, session_factory)
+    assert create_film(client, admin, "One", [PNG]).status_code == 201
+    assert create_film(client, admin, "Two", [PNG]).status_code == 201
+
+    images = query(session_factory, select(Image))
+    assert len(images) == 2
+    assert images[0].content_hash == images[1].content_hash
+    blob, = query(session_factory, select(ImageBlob))
+    assert blob.ref_count == 2
+    path = image_file_path(images[0])
+    assert path.read_bytes() == PNG
+
+    delete(session_factory, images[0].image_id)
+    assert path.exists()
+    delete(session_factory, images[1].image_id)
+    assert not path.exists()
+    assert query(session_factory, select(ImageBlob)) == []
+
+def test_failed_upload_keeps_files_referenced_elsewhere(client, session_factory):
+    admin = register_admin(client, session_factory)
+    assert create_film(client, admin, "One", [PNG]).status_code == 201
+    image, = query(session_factory, select(Image))
+
+    # the second file isn't an image, so the whole film is rolled back
+    response = create_film(client, admin, "Two", [PNG, b"not an image"])
+    assert response.status_code == 400
+    assert image_file_path(image).read_bytes() == PNG
+    blob, = query(session_factory, select(ImageBlob))
+    assert blob.ref_count == 1
+    assert temp_files() == []
+
+def test_failed_upload_removes_its_new_files(client, session_factory, monkeypatch):
+    from app.api.films import service
+
+    store_image_files = service.store_image_files
+
+    async def store_then_fail(uploads):
+        await store_image_files(uploads)
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(service, "store_image_files", store_then_fail)
+    admin = register_admin(client, session_factory)
+    assert create_film(client, admin, "One", [PNG]).status_code == 400
+
+    assert query(session_factory, select(Film)) == []
+    assert query(session_factory, select(ImageBlob)) == []
+    assert os.listdir(IMAGE_PATH) == []
+
+def test_failed_delete_keeps_the_file(client, session_factory):
+    admin = register_admin(client, session_factory)
+    assert create_film(client, admin, "One", [PNG]).status_code == 201
+    image, = query(session_factory, select(Image))
+
+    async def run():
+        async with session_factory() as session:
+            async def fail():
+                raise RuntimeError("commit failed")
+
+            session.commit = fail
+            with pytest.raises(RuntimeError):
+                await delete_image(image.image_id, session)
+
+    asyncio.run(run())
+    assert image_file_path(image).read_bytes() == PNG
+    assert len(query(session_factory, select(Image))) == 1
+    blob, = query(session_factory, select(ImageBlob))
+    assert blob.ref_count == 1
+
+def test_content_uploaded_again_before_cleanup_is_kept(client, session_factory, monkeypatch):
+    from app.api.images import service
+
+    admin = register_admin(client, session_factory)
+    assert create_film(client, admin, "One", [PNG]).status_code == 201
+    image, = query(session_factory, select(Image))
+    remove_unused_blob_files = service.remove_unused_blob_files
+
+    async def upload_then_remove(blobs, session):
+        # another upload registers the same content between the delete's commit
+        # and its cleanup
+        async with session_factory() as other:
+            await service.register_image_blobs([image], other)
+            await other.commit()
+        await remove_unused_blob_files(blobs, session)
+
+    monkeypatch.setattr(service, "remove_unused_blob_files", upload_then_remove)
+    delete(session_factory, image.image_id)
+    assert image_file_path(image).read_bytes() == PNG
+    blob, = query(session_factory, select(ImageBlob))
+    assert blob.ref_count == 1
@@ -0,0 +1,74 @@
+import asyncio
+import csv
+
+from sqlmodel import func, select
+
+from app.api.films import importer
+from app.db.models import Film, GenreFilm
+from helpers import create_genre, import_file, register_admin
+
+def count(session_factory, model) -> int:
+    async def run():
+        async with session_factory() as session:
+            return (await session.exec(select(func.count()).select_from(model))).one()
+    return asyncio.run(run())
+
+def test_ndjson_reports_bad_rows(client, session_factory):
+    admin = register_admin(client, session_factory)
+    create_genre(client, admin, "Drama")
+    content = b"\n".join([
+        b'{"title": "One", "air_status": "airing", "film_type": "Movie", "genres": ["Drama"]}',
+        b'{"title": "Bad \xff bytes", "air_status": "airing", "film_type": "Movie"}',
+        b'{"title": "Missing genre", "air_status": "airing", "film_type": "Movie", "genres": ["Nope"]}',
+        b'not json',
+        b'{"title": "Two", "air_status": "finished_airing", "film_type": "Series"}',
+    ])
+    response = import_file(client, admin, "films.ndjson", content)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["imported"] == 2
+    assert report["failed"] == 3
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4]
+    assert "UTF-8" in report["errors"][0]["error"]
+    assert count(session_factory, Film) == 2
+    assert count(session_factory, GenreFilm) == 1
+
+def test_csv_errors_do_not_abort_the_load(client, session_factory):
+    admin = register_admin(client, session_factory)
+    content = (
+        b"title,air_status,film_type\r\n"
+        b"One,airing,Movie\r\n"
+        + b"x" * 100 + b",airing,Movie\r\n"
+        b"Caf\xe9,airing,Movie\r\n"
+        b"Two,airing,Movie\r\n"
+    )
+    limit = csv.field_size_limit(64)
+    try:
+        response = import_file(client, admin, "films.csv", content)
+    finally:
+        csv.field_size_limit(limit)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["imported"] == 2
+    assert [error["line"] for error in report["errors"]] == [3, 4]
+    assert count(session_factory, Film) == 2
+
+def test_format_parameter(client, session_factory):
+    admin = register_admin(client, session_factory)
+    content = b"title,air_status,film_type\r\nOne,airing,Movie\r\n"
+    response = import_file(client, admin, "films.txt", content, format="csv")
+    assert response.json()["imported"] == 1
+    assert import_file(client, admin, "films.txt", content, format="xml").status_code == 400
+
+def test_batches_stay_under_bind_parameter_limit(client, session_factory, monkeypatch):
+    assert importer.IMPORT_BATCH_SIZE * len(Film.__table__.columns) <= importer.MAX_BIND_PARAMETERS
+    # with 6 parameters per statement the genre links of one film need two inserts
+    monkeypatch.setattr(importer, "MAX_BIND_PARAMETERS", 6)
+    admin = register_admin(client, session_factory)
+    genres = ["Drama", "Comedy", "Horror", "Action"]
+    for genre in genres:
+        create_genre(client, admin, genre)
+    content = b'{"title": "One", "air_status": "airing", "film_type": "Movie", "genres": %s}' % str(genres).replace("'", '"').encode()
+    response = import_file(client, admin, "films.ndjson", content)
+    assert response.json()["imported"] == 1
+    assert count(session_factory, GenreFilm) == 4
@@ -0,0 +1,58 @@
+import base64
+import json
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+
+from app.db.models import Film
+from app.deps.pagination import decode_cursor, encode_cursor, paginate
+
+def forge(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def test_cursor_round_trip():
+    film_id = uuid4()
+    created_at = datetime(2026, 1, 2, 3, 4, 5)
+    assert decode_cursor(encode_cursor(created_at, film_id)) == {"key": created_at, "id": film_id, "sort": None}
+    assert decode_cursor(encode_cursor(7.5, film_id, "rating")) == {"key": 7.5, "id": film_id, "sort": "rating"}
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    forge([1, 2]),
+    forge({"k": 1}),
+    forge({"k": 1, "id": 12345}),
+    forge({"k": 1, "id": "not a uuid"}),
+    forge({"k": 1, "t": "dt", "id": str(uuid4())}),
+    forge({"k": 1, "id": str(uuid4()), "s": 5}),
+])
+def test_forged_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+    assert e.value.status_code == 400
+
+@pytest.mark.parametrize("sort_column, key", [
+    (Film.created_at, "2026-01-01"),
+    (Film.created_at, 5),
+    (Film.rating_count, "5"),
+    (Film.rating_count, 1.5),
+    (Film.rating_count, True),
+])
+def test_cursor_key_must_match_sort_column(sort_column, key):
+    pagination = {"limit": 10, "keyset": True, "after": {"key": key, "id": uuid4()}}
+    with pytest.raises(HTTPException) as e:
+        paginate(select(Film), pagination, sort_column, Film.id)
+    assert e.value.status_code == 400
+
+def test_int_key_is_accepted_for_float_column():
+    from app.db.models import film_average_rating
+
+    pagination = {"limit": 10, "keyset": True, "after": {"key": 7, "id": uuid4()}}
+    paginate(select(Film), pagination, film_average_rating, Film.id)
+
+@pytest.mark.parametrize("sort, key", [("rating", "abc"), ("popularity", "abc"), ("newest", 5)])
+def test_film_list_rejects_forged_key(client, sort, key):
+    response = client.get("/api/films", params={"sort": sort, "cursor": forge({"k": key, "id": str(uuid4())})})
+    assert response.status_code == 400
@@ -0,0 +1,42 @@
+import pytest
+from starlette.requests import Request
+
+from app.deps import rate_limit
+
+def request(forwarded: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.1", 1234)})
+
+def test_forwarded_header_ignored_by_default(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_PROXIES", 0)
+    assert rate_limit.client_ip(request("1.2.3.4")) == "10.0.0.1"
+
+@pytest.mark.parametrize("forwarded, proxies, expected", [
+    # the proxy appended the real client after a forged entry
+    ("6.6.6.6, 1.2.3.4", 1, "1.2.3.4"),
+    ("1.2.3.4", 1, "1.2.3.4"),
+    ("6.6.6.6, 1.2.3.4, 172.16.0.2", 2, "1.2.3.4"),
+    # fewer entries than trusted proxies, the header can't be trusted
+    ("1.2.3.4", 2, "10.0.0.1"),
+    (None, 1, "10.0.0.1"),
+])
+def test_client_is_the_entry_the_trusted_proxy_added(monkeypatch, forwarded, proxies, expected):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_PROXIES", proxies)
+    assert rate_limit.client_ip(request(forwarded)) == expected
+
+def test_forged_entries_share_one_bucket(client, monkeypatch):
+    from app.api.auth.deps import login_ip_limit
+
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_PROXIES", 1)
+    statuses = []
+    for attempt in range(login_ip_limit.attempts + 1):
+        response = client.post(
+            "/api/auth/login",
+            # a different forged entry each time, the proxy's entry stays the same
+            data={"username": f"user{attempt}", "password": "wrong"},
+            headers={"X-Forwarded-For": f"6.6.6.{attempt}, 1.2.3.4"},
+        )
+        statuses.append(response.status_code)
+    assert statuses[:-1] == [401] * login_ip_limit.attempts
+    assert statuses[-1] == 429
+    assert "Retry-After" in response.headers
@@ -0,0 +1,49 @@
+import asyncio
+import shutil
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.reviews.schemas import ReviewCreate
+from app.api.reviews.service import create_review
+from app.db.db import db_read_session
+from app.db.models import UserFilm
+from app.enums import UserFilmStatus
+from helpers import add_rows, film_id, import_films, register, register_admin, user_id
+
+def test_cached_film_detail_ignores_a_lagging_replica(client, session_factory, tmp_path):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": "Film"}])
+    film = UUID(film_id(client, "Film"))
+    writer_tokens = register(client, "writer")
+    writer = user_id(session_factory, "writer")
+    add_rows(session_factory, UserFilm(user_id=writer, film_id=film, status=UserFilmStatus.COMPLETED))
+    assert client.get(f"/api/films/{film}").json()["rating_count"] == 0
+
+    # the replica stops here, before the review
+    replica_path = tmp_path / "replica.db"
+    shutil.copy(session_factory.kw["bind"].url.database, replica_path)
+    replica = sessionmaker(
+        bind=create_async_engine(f"sqlite+aiosqlite:///{replica_path}"), class_=AsyncSession, expire_on_commit=False,
+    )
+
+    async def replica_session():
+        async with replica() as session:
+            yield session
+
+    client.app.dependency_overrides[db_read_session] = replica_session
+
+    async def write():
+        async with session_factory() as session:
+            await create_review(writer, film, ReviewCreate(rating=8, comment="Good"), session)
+
+    asyncio.run(write())
+
+    # the write evicted the cached detail; the refill comes from the primary,
+    # so neither the writer nor anyone else sees the replica's old state
+    for headers in ({}, {"Authorization": f"Bearer {writer_tokens['access_token']}"}):
+        detail = client.get(f"/api/films/{film}", headers=headers).json()
+        assert (detail["rating_count"], detail["review_stats"]["review_count"]) == (1, 1)
+    asyncio.run(replica.kw["bind"].dispose())
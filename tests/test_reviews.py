@@ -0,0 +1,168 @@
+import asyncio
+import math
+from uuid import UUID, uuid4
+
+import pytest
+
+from sqlmodel import func, literal, select
+
+from app.api.reviews.service import WILSON_Z, react_to_review, review_helpfulness, unreact_to_review
+from app.db.models import Film, FilmReviewStats, Reaction, Review, User
+from app.enums import FilmStatus, FilmType, ReactionType
+from app.exceptions import UniqueConstraintViolation
+from helpers import add_rows, film_id, import_films, query, register, register_admin, user_id
+
+def reviewed_film(client, session_factory, likes: list[tuple[int, int]]) -> str:
+    # one review per (like_count, dislike_count), each by its own user
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": "Film"}])
+    film = film_id(client, "Film")
+    reviews = []
+    for index, (like_count, dislike_count) in enumerate(likes):
+        register(client, f"reviewer{index}")
+        reviews.append(Review(
+            user_id=user_id(session_factory, f"reviewer{index}"), film_id=UUID(film), rating=5,
+            like_count=like_count, dislike_count=dislike_count,
+        ))
+    add_rows(session_factory, *reviews)
+    return film
+
+def wilson(likes: int, dislikes: int) -> float:
+    n = likes + dislikes
+    if n == 0:
+        return 0.0
+    p = likes / n
+    z2 = WILSON_Z ** 2
+    return (p + z2 / (2 * n) - WILSON_Z * math.sqrt((p * (1 - p) + z2 / (4 * n)) / n)) / (1 + z2 / n)
+
+def react(session_factory, function, *args):
+    async def run():
+        async with session_factory() as session:
+            await function(*args, session)
+    asyncio.run(run())
+
+def test_helpfulness_is_the_wilson_lower_bound(session_factory):
+    counts = [(0, 0), (1, 0), (0, 1), (1, 1), (5, 0), (40, 5), (100, 100), (3, 97)]
+    scores = query(session_factory, select(*(review_helpfulness(literal(l), literal(d)) for l, d in counts)))[0]
+    for (likes, dislikes), score in zip(counts, scores):
+        assert score == pytest.approx(wilson(likes, dislikes))
+    # a single like is far from proof, many likes and a few dislikes are
+    assert wilson(1, 0) < 0.3 < 0.7 < wilson(40, 5)
+
+def test_score_follows_reactions(session_factory):
+    film = Film(title="Film", air_status=FilmStatus.AIRING, film_type=FilmType.MOVIE)
+    author, alice, bob = (User(username=name, password_hash="x", display_name=name) for name in ("author", "alice", "bob"))
+    review = Review(id=uuid4(), user_id=author.id, film_id=film.id, rating=5)
+    add_rows(session_factory, film, author, alice, bob)
+    add_rows(session_factory, review)
+
+    def score():
+        return query(session_factory, select(Review.score).where(Review.id == review.id))[0]
+
+    react(session_factory, react_to_review, alice.id, review.id, ReactionType.LIKE)
+    assert score() == pytest.approx(wilson(1, 0))
+    react(session_factory, react_to_review, bob.id, review.id, ReactionType.LIKE)
+    assert score() == pytest.approx(wilson(2, 0))
+    react(session_factory, react_to_review, bob.id, review.id, ReactionType.DISLIKE)
+    assert score() == pytest.approx(wilson(1, 1))
+    react(session_factory, unreact_to_review, alice.id, review.id)
+    assert score() == pytest.approx(wilson(0, 1))
+    react(session_factory, unreact_to_review, bob.id, review.id)
+    assert score() == 0
+
+def test_helpful_sort_prefers_well_supported_reviews(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": "Film"}])
+    film = UUID(film_id(client, "Film"))
+    users = [User(username=f"user{index}", password_hash="x", display_name="x") for index in range(47)]
+    lucky = Review(id=uuid4(), user_id=users[0].id, film_id=film, rating=5)
+    popular = Review(id=uuid4(), user_id=users[1].id, film_id=film, rating=4)
+    add_rows(session_factory, *users)
+    add_rows(session_factory, lucky, popular)
+
+    react(session_factory, react_to_review, users[2].id, lucky.id, ReactionType.LIKE)
+    for index, user in enumerate(users[2:]):
+        reaction = ReactionType.LIKE if index < 40 else ReactionType.DISLIKE
+        react(session_factory, react_to_review, user.id, popular.id, reaction)
+
+    # 1 like and no dislikes is a perfect ratio, 40/5 is better evidence
+    items = client.get(f"/api/reviews/film/{film}", params={"sort": "helpful"}).json()
+    assert [(item["like_count"], item["dislike_count"]) for item in items] == [(40, 5), (1, 0)]
+
+def test_cursor_of_another_review_sort_is_rejected(client, session_factory):
+    film = reviewed_film(client, session_factory, [(3, 0), (2, 0), (1, 0)])
+    url = f"/api/reviews/film/{film}"
+    cursor = client.get(url, params={"sort": "most_liked", "limit": 1, "cursor": ""}).json()["next_cursor"]
+    # an int like count would pass as a helpfulness score, only the sort name tells them apart
+    assert client.get(url, params={"sort": "helpful", "cursor": cursor}).status_code == 400
+    assert client.get(url, params={"sort": "newest", "cursor": cursor}).status_code == 400
+    response = client.get(url, params={"sort": "most_liked", "limit": 1, "cursor": cursor})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["like_count"] == 2
+
+def test_reaction_to_missing_review(session_factory):
+    user = User(username="alice", password_hash="x", display_name="x")
+    add_rows(session_factory, user)
+
+    async def scenario():
+        async with session_factory() as session:
+            with pytest.raises(ValueError, match="Review not found"):
+                await react_to_review(user.id, uuid4(), ReactionType.LIKE, session)
+            return (await session.exec(select(func.count()).select_from(Reaction))).one()
+
+    assert asyncio.run(scenario()) == 0
+
+def test_concurrent_reactions_lose_no_updates(pg_session_factory):
+    # sqlite serializes every writer, so only postgres shows lost updates
+    session_factory = pg_session_factory
+    film = Film(title="Film", air_status=FilmStatus.AIRING, film_type=FilmType.MOVIE)
+    users = [User(username=f"user{index}", password_hash="x", display_name="x") for index in range(40)]
+    review = Review(id=uuid4(), user_id=users[0].id, film_id=film.id, rating=5)
+    add_rows(session_factory, film, *users)
+    add_rows(session_factory, review)
+
+    async def call(function, *args):
+        # one session per caller, like separate requests
+        async with session_factory() as session:
+            try:
+                return await function(*args, session)
+            except UniqueConstraintViolation:
+                return None
+
+    async def scenario():
+        # everyone likes at once, and each like is sent twice
+        await asyncio.gather(*(
+            call(react_to_review, user.id, review.id, ReactionType.LIKE) for user in users for _ in range(2)
+        ))
+        # then half switch to dislike while a quarter withdraw
+        await asyncio.gather(
+            *(call(react_to_review, user.id, review.id, ReactionType.DISLIKE) for user in users[:20]),
+            *(call(unreact_to_review, user.id, review.id) for user in users[20:30]),
+        )
+        async with session_factory() as session:
+            reacted = dict((await session.exec(
+                select(Reaction.reaction_type, func.count()).group_by(Reaction.reaction_type)
+            )).all())
+            stored = await session.get(Review, review.id)
+            stats = await session.get(FilmReviewStats, film.id)
+        return reacted, stored, stats
+
+    reacted, stored, stats = asyncio.run(scenario())
+    assert reacted == {ReactionType.LIKE: 10, ReactionType.DISLIKE: 20}
+    assert (stored.like_count, stored.dislike_count) == (10, 20)
+    assert (stats.like_total, stats.dislike_total) == (10, 20)
+
+def test_reactions_leave_the_cached_film_detail(client, session_factory):
+    from app.cache import film_detail_cache
+
+    film = reviewed_film(client, session_factory, [(0, 0)])
+    review_id, = query(session_factory, select(Review.id))
+    reader = User(username="reader", password_hash="x", display_name="x")
+    add_rows(session_factory, reader)
+    assert client.get(f"/api/films/{film}").json()["review_stats"]["like_total"] == 0
+
+    react(session_factory, react_to_review, reader.id, review_id, ReactionType.LIKE)
+    # totals may lag until the entry expires, a hot film keeps its cache entry
+    assert client.get(f"/api/films/{film}").json()["review_stats"]["like_total"] == 0
+    film_detail_cache._store.clear()
+    assert client.get(f"/api/films/{film}").json()["review_stats"]["like_total"] == 1
@@ -0,0 +1,43 @@
+from helpers import import_films, register_admin
+
+TITLES = ["Matrix", "The Matrix Reloaded", "Animatrix", "Matrix 4", "Casablanca", "100% Matrix_"]
+
+def search(client, title: str, **params):
+    response = client.get("/api/films/search", params={"title": title, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def walk(client, title: str) -> list[str]:
+    titles = []
+    cursor = ""
+    while cursor is not None:
+        page = search(client, title, limit=2, cursor=cursor)
+        titles += [film["title"] for film in page["items"]]
+        cursor = page["next_cursor"]
+    return titles
+
+def test_best_matches_first(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": title} for title in TITLES])
+    titles = [film["title"] for film in search(client, "matrix", limit=100)]
+    assert "Casablanca" not in titles
+    assert titles[0] == "Matrix"
+    assert titles.index("Matrix 4") < titles.index("The Matrix Reloaded")
+
+def test_cursor_pages_rank_like_offset_pages(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": title} for title in TITLES])
+    assert walk(client, "matrix") == [film["title"] for film in search(client, "matrix", limit=100)]
+
+def test_like_wildcards_are_literal(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": title} for title in TITLES])
+    assert [film["title"] for film in search(client, "100%")] == ["100% Matrix_"]
+    assert [film["title"] for film in search(client, "x_")] == ["100% Matrix_"]
+
+def test_cursor_of_another_listing_is_rejected(client, session_factory):
+    admin = register_admin(client, session_factory)
+    import_films(client, admin, [{"title": title} for title in TITLES])
+    cursor = client.get("/api/films", params={"limit": 1, "cursor": ""}).json()["next_cursor"]
+    response = client.get("/api/films/search", params={"title": "matrix", "cursor": cursor})
+    assert response.status_code == 400